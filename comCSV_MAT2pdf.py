@@ -46,11 +46,11 @@ def apply_column_mapping(df: pd.DataFrame, group_id: str) -> pd.DataFrame:
         logging.warning(f"Column mapping ruleset '{ruleset_name}' not found in COLUMN_MAPPING_RULES.")
         return df
 
-    original_columns = df.columns
-    df.columns = df.columns.str.strip()
-    df.rename(columns=mapping_dict, inplace=True)
+    stripped_columns = df.columns.str.strip()
+    get = mapping_dict.get
+    df.columns = stripped_columns.map(lambda c: get(c, c))
     
-    renamed_cols_count = sum(1 for col in original_columns if col.strip() in mapping_dict)
+    renamed_cols_count = sum(1 for col in stripped_columns if col in mapping_dict)
     if renamed_cols_count > 0:
         logging.info(f"Applied column mapping '{ruleset_name}' for group '{group_id}', renamed {renamed_cols_count} columns.")
     
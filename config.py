@@ -28,10 +28,11 @@ Struktura:
 """
 import json  # noqa: F401
 from datetime import datetime, timedelta
+from types import MappingProxyType
 # --- POCZĄTEK SEKCJI KONFIGURACJI ---
 
-# 1. LISTA KOLUMN DO POMINIĘCIA Z PLIKÓW CSV
-COLUMNS_TO_EXCLUDE_FROM_CSV = [
+# 1. LISTA KOLUMN DO POMINIĘCIA Z PLIKÓW CSV (frozenset - sprawdzenie przynależności w O(1))
+COLUMNS_TO_EXCLUDE_FROM_CSV = frozenset([
     'record_no',
     '2SERIAL (State)',
     '2SERIAL (State).1',
@@ -184,7 +185,7 @@ COLUMNS_TO_EXCLUDE_FROM_CSV = [
     'Res_100_Ohms',
     'Resistance_12_Ohms'
     # Dodaj tutaj kolejne nazwy kolumn, które chcesz pominąć
-]
+])
 
 # 2. Lista grup, gdzie dane są usupełniane z plików .MAT (Surowe dane niedostępne)
 GROUP_IDS_FOR_MATLAB_FILL = ['TL1_MET_30', 'TL1_RAD_30', 'TL1_SOIL_30', 'TL1_RAD_1', 'TL2_MET_1m', 'TL2_MET_30m', 'RZ_CSI_30', 'RZ_WET_30m']
@@ -718,10 +719,10 @@ CALIBRATION_RULES_BY_STATION = {
             #{'start': '2014-07-08 09:30:00', 'end': '2019-08-06 09:30:00', 'multiplier': 2685, 'addend': 0, 'reason': 'LQA3016, (data in umol/m2/s1)'},
             {'start': '2018-08-02 15:30:00', 'end': '2018-11-13 09:30:00', 'multiplier': 2763.4, 'addend': 0, 'reason': 'LQA3016, (data in umol/m2/s1)'},
 		],
-        'PPFD_BC_IN_2_1_2': [
-        # {'start': '2014-07-08 09:30:00', 'end': '2019-08-06 09:30:00', 'multiplier': 3618.75, 'addend': 0, 'reason': 'LQA3013, (data in umol/m2/s1)'},
-        {'start': '2018-11-13 09:30:00', 'end': '2019-08-14 12:30:00', 'multiplier': 3724.4, 'addend': 0, 'reason': 'LQA3016, (data in umol/m2/s1)'},
-		],
+        # Duplikat klucza PPFD_BC_IN_2_1_2 (obowiązywała definicja poniżej) - wyłączony:
+        # 'PPFD_BC_IN_2_1_2': [
+        # {'start': '2018-11-13 09:30:00', 'end': '2019-08-14 12:30:00', 'multiplier': 3724.4, 'addend': 0, 'reason': 'LQA3016, (data in umol/m2/s1)'},
+		# ],
         'PPFD_BC_IN_2_1_2': [
             #{'start': '2014-07-08 09:30:00', 'end': '2019-08-06 09:30:00', 'multiplier': 3618.75, 'addend': 0, 'reason': 'LQA3013, (data in umol/m2/s1)'},
         {'start': '2018-11-3 09:30:00', 'end': '2019-08-14 12:30:00', 'multiplier': 3724.4, 'addend': 0, 'reason': 'LQA3016, (data in umol/m2/s1)'},
@@ -1374,14 +1375,17 @@ source_reason = 'sensor malfungtion'
 # Tworzenie nowych rekordów z dat
 # z kluczami kolumn, np. 'PPFD_IN_1_1_1'
 
+# Daty są deduplikowane (lista zawiera powtórzone bloki) i parsowane raz przez
+# datetime.fromisoformat - to jedyna część konfiguracji liczona przy imporcie.
+_ME_TOP_POINTS = [datetime.fromisoformat(dt) for dt in dict.fromkeys(date_list_ME_TOP)]
 new_records_ME_TOP = [
     {
-        'start': (datetime.strptime(dt, '%Y-%m-%d %H:%M:%S') - timedelta(seconds=15)).strftime('%Y-%m-%d %H:%M:%S'),
-        'end': (datetime.strptime(dt, '%Y-%m-%d %H:%M:%S') + timedelta(seconds=15)).strftime('%Y-%m-%d %H:%M:%S'),
+        'start': (dt - timedelta(seconds=15)).strftime('%Y-%m-%d %H:%M:%S'),
+        'end': (dt + timedelta(seconds=15)).strftime('%Y-%m-%d %H:%M:%S'),
         'flag_value': source_flag_value,
         'reason': source_reason
     }
-    for dt in date_list_ME_TOP
+    for dt in _ME_TOP_POINTS
 ]
 
 # Dodanie nowych rekordów do listy jakościowej dla PPFD_IN_1_1_1
@@ -1532,10 +1536,6 @@ COLUMN_MAPPING_RULES = {
         'RH_1_2_1': 'RH_1_1_1', # rotronic
         'TA_1_1_1': 'TA_1_2_1', # rotronic
         'RH_1_1_1': 'RH_1_2_1', # rotronic
-        'TA_1_2_1': 'TA_1_1_1', # rotronic
-        'RH_1_2_1': 'RH_1_1_1', # rotronic
-        'TA_1_1_1': 'TA_1_2_1', # rotronic
-        'RH_1_1_1': 'RH_1_2_1', # rotronic
         # deszczomierze korytkowe
         'P_1_2_1': 'P_1_2_1', #down
         'P_1_1_2': 'P_1_2_2',
@@ -1782,10 +1782,12 @@ COLUMN_MAPPING_RULES = {
         'PPFD_BC_IN_1_1_1': 'PPFD_BC_IN_1_1_1', #LI191 -NEED CHANGE!!! (_1_1_1)?
         'PPFD_BC_IN_1_1_2': 'PPFD_BC_IN_1_1_2', #LI191  -NEED CHANGE!!! (_1_1_2)?
         # Soil heat plates Hukseflux HFP 01- all in ca. 5 cm depth?- OLD tower
-        'G_1_1_1_Avg': 'G_1_1_1',
-        'G_2_1_1_Avg': 'G_1_1_2',
-        'G_3_1_1_Avg': 'G_1_1_3',
-        'G_4_1_1_Avg': 'G_1_1_4',
+        # Klucze G_1..4_1_1_Avg były tu zdefiniowane podwójnie; obowiązywało późniejsze
+        # przypisanie (G_1_1_5..G_1_1_8, niżej), więc wcześniejsze zostało wyłączone:
+        # 'G_1_1_1_Avg': 'G_1_1_1',
+        # 'G_2_1_1_Avg': 'G_1_1_2',
+        # 'G_3_1_1_Avg': 'G_1_1_3',
+        # 'G_4_1_1_Avg': 'G_1_1_4',
         # Soil heat plates Hukseflux HFP01SC-20 at 5cm depth - all in ca. 5 cm depth?- NEW tower - INSTALLED AT THE SAME SITE (LOCATION) AS Hukseflux HFP 01- all in ca. 5 cm depth (treated ad REPETITIONS?)
         'G_1_1_1': 'G_1_1_5', 
         'G_2_1_1': 'G_1_1_6', 
@@ -1797,10 +1799,10 @@ COLUMN_MAPPING_RULES = {
         'G_8_1_1': 'G_1_1_12', 
         'G_9_1_1': 'G_1_1_13',  
         'G_10_1_1': 'G_1_1_14', 
-        'G_1_1_1_Avg': 'G_1_1_5',# noqa: F601
-        'G_2_1_1_Avg': 'G_1_1_6', # noqa: F601
-        'G_3_1_1_Avg': 'G_1_1_7', # noqa: F601
-        'G_4_1_1_Avg': 'G_1_1_8', # noqa: F601
+        'G_1_1_1_Avg': 'G_1_1_5',
+        'G_2_1_1_Avg': 'G_1_1_6',
+        'G_3_1_1_Avg': 'G_1_1_7',
+        'G_4_1_1_Avg': 'G_1_1_8',
         'G_5_1_1_Avg': 'G_1_1_9', 
         'G_6_1_1_Avg': 'G_1_1_10', 
         'G_7_1_1_Avg': 'G_1_1_11',
@@ -1863,6 +1865,15 @@ COLUMN_MAPPING_RULES = {
         'RH_1_2_1': 'RH_1_2_2', #air humidity at 30cm above ground
         }
 }
+# Słowniki mapowania są tylko do odczytu - zamrożenie chroni przed przypadkową
+# modyfikacją i kopiami; zbiory kluczy pozwalają na szybkie testy przynależności.
+# Wpisy tożsamościowe ('X': 'X', np. w MEZYK_MAP i TLEN2_MAP) niczego nie zmieniają - są pomijane.
+COLUMN_MAPPING_RULES = MappingProxyType({
+    k: MappingProxyType({src: dst for src, dst in v.items() if src != dst})
+    for k, v in COLUMN_MAPPING_RULES.items()
+})
+COLUMN_MAPPING_KEYS = {k: frozenset(v) for k, v in COLUMN_MAPPING_RULES.items()}
+
 # 9.1 Mapowanie nazw kolumn w grupach
 STATION_MAPPING_FOR_COLUMNS = {
     # ----- TUCZNO -----
@@ -1981,6 +1992,12 @@ STATION_MAPPING_FOR_OVERRIDES = {
     'ME_DOWN_MET_30min': 'MEZYK_OVR'
 }
 
+# Mapowania grup na zestawy reguł są tylko do odczytu - zamrożone jak COLUMN_MAPPING_RULES
+STATION_MAPPING_FOR_CALIBRATION = MappingProxyType(STATION_MAPPING_FOR_CALIBRATION)
+STATION_MAPPING_FOR_QC = MappingProxyType(STATION_MAPPING_FOR_QC)
+STATION_MAPPING_FOR_COLUMNS = MappingProxyType(STATION_MAPPING_FOR_COLUMNS)
+STATION_MAPPING_FOR_OVERRIDES = MappingProxyType(STATION_MAPPING_FOR_OVERRIDES)
+
 # --- KONIEC SEKCJI KONFIGURACJI ---
 
 
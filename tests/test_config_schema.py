@@ -0,0 +1,23 @@
+import ast
+from collections import Counter
+from pathlib import Path
+
+CONFIG_PATH = Path(__file__).resolve().parent.parent / 'config.py'
+
+
+def _duplicate_dict_keys(source: str):
+    """Zwraca listę (linia, {klucz: liczba}) dla literałów słownikowych z powtórzonymi kluczami."""
+    duplicates = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Dict):
+            keys = [k.value for k in node.keys if isinstance(k, ast.Constant)]
+            repeated = {k: n for k, n in Counter(keys).items() if n > 1}
+            if repeated:
+                duplicates.append((node.lineno, repeated))
+    return duplicates
+
+
+def test_config_has_no_duplicate_dict_keys():
+    # Python po cichu zachowuje tylko ostatnie przypisanie powtórzonego klucza
+    duplicates = _duplicate_dict_keys(CONFIG_PATH.read_text(encoding='utf-8'))
+    assert not duplicates, f"Powtórzone klucze w config.py: {duplicates}"
@@ -0,0 +1,118 @@
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import unified_script
+from unified_script import (_read_csv_for_merge, _write_csv, get_toa5_metadata, read_toa5_data,
+                            save_dataframe_to_csv)
+
+TOA5_HEADER = (
+    '"TOA5","TEST","CR1000","1234","CR1000.Std.32","CPU:test.CR1","1","Table30"\n'
+    '"TIMESTAMP","RECORD","Ta","Empty"{extra_name}\n'
+    '"TS","RN","degC",""{extra_unit}\n'
+    '"","","Avg","Avg"{extra_unit}\n'
+)
+TOA5_ROWS = [
+    ('"2020-01-01 00:00:00"', '0', '1.5', '"NAN"', '"2020-01-01"'),
+    ('"2020-01-01 00:30:00"', '1', '"NAN"', '"NAN"', '"2020-01-02"'),
+    ('"2020-01-01 01:00:00"', '2', '-3.25', '"NAN"', '"2020-01-03"'),
+]
+
+
+def _write_toa5(path, with_date_text):
+    extra = ',"Note"' if with_date_text else ''
+    lines = [TOA5_HEADER.format(extra_name=extra, extra_unit=',""' if with_date_text else '')]
+    for row in TOA5_ROWS:
+        lines.append(','.join(row if with_date_text else row[:-1]) + '\n')
+    path.write_text(''.join(lines), encoding='latin-1')
+
+
+@pytest.mark.parametrize('with_date_text', [False, True])
+def test_toa5_pyarrow_and_c_engines_agree(tmp_path, monkeypatch, with_date_text):
+    """Both engines must give the same frame, including dtypes of all-NAN and date-like text columns."""
+    path = tmp_path / 'station_Table30.dat'
+    _write_toa5(path, with_date_text)
+    metadata = get_toa5_metadata(path)
+
+    pyarrow_results = []
+    read_pyarrow = unified_script._read_csv_pyarrow
+
+    def recording_read(*args, **kwargs):
+        result = read_pyarrow(*args, **kwargs)
+        pyarrow_results.append(result)
+        return result
+
+    monkeypatch.setattr(unified_script, '_read_csv_pyarrow', recording_read)
+    with_pyarrow = read_toa5_data(path, metadata)
+    monkeypatch.setattr(unified_script, 'PYARROW_AVAILABLE', False)
+    with_c_engine = read_toa5_data(path, metadata)
+
+    # A date-like text column sends the read to the C engine, otherwise pyarrow is used
+    assert (pyarrow_results[0] is None) == with_date_text
+    assert len(with_c_engine) == len(TOA5_ROWS)
+    assert with_c_engine['Empty'].dtype == 'float64'
+    pd.testing.assert_frame_equal(with_pyarrow, with_c_engine)
+
+
+def test_merge_csv_pyarrow_and_c_engines_agree(tmp_path, monkeypatch):
+    """An existing group CSV with an empty column must read back the same with either engine."""
+    path = tmp_path / 'GROUP.csv'
+    path.write_text(
+        'TIMESTAMP,Ta,Ta_flag,Empty\n'
+        '2020-01-01 00:00:00,1.5,0,\n'
+        '2020-01-01 00:30:00,,99,\n'
+        '2020-01-01 01:00:00,-3.25,0,\n')
+
+    with_pyarrow = _read_csv_for_merge(path)
+    monkeypatch.setattr(unified_script, 'PYARROW_AVAILABLE', False)
+    with_c_engine = _read_csv_for_merge(path)
+
+    assert with_c_engine['Empty'].dtype == 'float64'
+    assert with_c_engine['Ta_flag'].dtype == 'int64'
+    pd.testing.assert_frame_equal(with_pyarrow, with_c_engine)
+
+
+def test_write_csv_matches_to_csv_with_mixed_object_column(tmp_path):
+    """The written file must be byte-identical to to_csv, also for mixed-type and extra datetime columns."""
+    df = pd.DataFrame({
+        'TIMESTAMP': pd.to_datetime(['2020-01-01 00:00:00', '2020-01-01 00:30:00', '2020-01-01 01:00:00']),
+        'Ta': [1.0, np.nan, -3.25],
+        'Ta_flag': np.array([0, 99, 0], dtype=np.int8),
+        'note': ['a', 5, None],
+        'logged': pd.to_datetime(['2020-01-02 00:00:00', None, '2020-01-02 01:00:00']),
+    })
+    path = tmp_path / 'GROUP.csv'
+    expected = df.to_csv(index=False, date_format='%Y-%m-%d %H:%M:%S')
+
+    _write_csv(df, path)
+
+    assert path.read_text() == expected
+    pd.testing.assert_frame_equal(pd.read_csv(path), pd.read_csv(io.StringIO(expected)))
+
+
+def test_save_dataframe_to_csv_writes_merged_mixed_text_column(tmp_path):
+    """Text read back from the existing file merged with numbers of the same column must still be saved."""
+    config = {'file_id': 'GROUP', 'output_dir': str(tmp_path), 'overwrite': False}
+    lock = threading.Lock()
+    first = pd.DataFrame({
+        'TIMESTAMP': pd.to_datetime(['2020-01-01 00:00:00', '2020-01-01 00:30:00']),
+        'Ta': [1.0, 2.0],
+        'note': ['a', 'b'],
+    })
+    second = pd.DataFrame({
+        'TIMESTAMP': pd.to_datetime(['2020-01-01 01:00:00', '2020-01-01 01:30:00']),
+        'Ta': [3.0, 4.0],
+        'note': pd.Series([5, 6], dtype=object),
+    })
+
+    save_dataframe_to_csv(first, 2020, config, lock)
+    save_dataframe_to_csv(second, 2020, config, lock)
+
+    saved = pd.read_csv(tmp_path / '2020' / 'GROUP.csv')
+    assert saved['Ta'].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert saved['note'].astype(str).tolist() == ['a', 'b', '5', '6']
@@ -3,6 +3,12 @@ import numpy as np
 
 from unified_script import _ensure_flag_columns_exist
 
+# Oczekiwane wartości flag jako stałe int8 (porównanie bez boxowania elementów)
+EXPECTED_A_FLAG = np.array([0, 99, 0, 99], dtype=np.int8)
+EXPECTED_B_FLAG = np.array([0, 0, 99, 0], dtype=np.int8)
+EXPECTED_C_FLAG = np.array([7, 7, 7], dtype=np.int8)
+EXPECTED_VALUE_FLAG = np.array([0, 99, 0], dtype=np.int8)
+
 
 def test_adds_missing_flag_columns_values_and_dtype():
     df = pd.DataFrame({
@@ -17,25 +23,26 @@ def test_adds_missing_flag_columns_values_and_dtype():
     assert 'b_flag' in out.columns
 
     # Values: 0 for notna, 99 for NaN
-    assert out['a_flag'].tolist() == [0, 99, 0, 99]
-    assert out['b_flag'].tolist() == [0, 0, 99, 0]
+    assert np.array_equal(out['a_flag'].to_numpy(), EXPECTED_A_FLAG)
+    assert np.array_equal(out['b_flag'].to_numpy(), EXPECTED_B_FLAG)
 
     # Dtype int8
-    assert out['a_flag'].dtype == 'int8'
-    assert out['b_flag'].dtype == 'int8'
+    assert out['a_flag'].dtype == np.int8
+    assert out['b_flag'].dtype == np.int8
 
 
 def test_preserves_existing_flag_columns():
     df = pd.DataFrame({
         'c': [np.nan, 2, 3],
-        'c_flag': [7, 7, 7],  # already exists, should not be recreated/modified
+        'c_flag': np.array([7, 7, 7], dtype=np.int8),  # already exists, should not be recreated/modified
     })
 
     out = _ensure_flag_columns_exist(df)
 
     assert 'c_flag' in out.columns
     # unchanged
-    assert out['c_flag'].tolist() == [7, 7, 7]
+    assert np.array_equal(out['c_flag'].to_numpy(), EXPECTED_C_FLAG)
+    assert out['c_flag'].dtype == np.int8
 
 
 def test_skips_non_numeric_and_cols_to_skip():
@@ -57,7 +64,7 @@ def test_skips_non_numeric_and_cols_to_skip():
 
     # Flag created for numeric column not skipped
     assert 'value_flag' in out.columns
-    assert out['value_flag'].tolist() == [0, 99, 0]
-    assert out['value_flag'].dtype == 'int8'
+    assert np.array_equal(out['value_flag'].to_numpy(), EXPECTED_VALUE_FLAG)
+    assert out['value_flag'].dtype == np.int8
 
 
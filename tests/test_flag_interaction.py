@@ -56,3 +56,45 @@ def test_flag_interaction_prevents_overwrite(monkeypatch):
     # Assert that _ensure_flag_columns_exist correctly created the missing flag column
     assert 'pressure_flag' in df3.columns
     assert df3['pressure_flag'].iloc[0] == 0
+
+
+def test_zero_flag_rule_still_creates_flag_column(monkeypatch):
+    """A matching rule with flag_value 0 creates a zero int8 flag column; a rule outside the data does not."""
+    df = pd.DataFrame({
+        'TIMESTAMP': pd.to_datetime(['2023-01-15', '2023-01-16']),
+        'pressure': [950.0, 951.0],
+        'humidity': [50.0, 51.0],
+    })
+    monkeypatch.setattr('unified_script.STATION_MAPPING_FOR_QC', {'TEST_GROUP': 'zero_rules'})
+    monkeypatch.setattr('unified_script.QUALITY_FLAGS', {
+        'zero_rules': {
+            'pressure': [{'start': '2023-01-01', 'end': '2023-01-31', 'flag_value': 0}],
+            'humidity': [{'start': '2024-01-01', 'end': '2024-01-31', 'flag_value': 0}],
+        }
+    })
+
+    out = apply_quality_flags(df, {'file_id': 'TEST_GROUP'})
+
+    assert 'pressure_flag' in out.columns
+    assert out['pressure_flag'].dtype == np.int8
+    assert out['pressure_flag'].tolist() == [0, 0]
+    assert 'humidity_flag' not in out.columns
+
+
+def test_range_flag_columns_follow_rule_order(monkeypatch):
+    """New flag columns are appended in VALUE_RANGE_FLAGS order, not in data-column order."""
+    df = pd.DataFrame({
+        'R_x': [100.0, 1.0],
+        'Ta_1': [100.0, 1.0],
+        'Ta_2': [1.0, 1.0],
+    })
+    monkeypatch.setattr('unified_script.VALUE_RANGE_FLAGS', {
+        'Ta': {'min': -50, 'max': 50},
+        'R': {'min': 0, 'max': 10},
+    })
+
+    out = apply_value_range_flags(df)
+
+    assert list(out.columns) == ['R_x', 'Ta_1', 'Ta_2', 'Ta_1_flag', 'R_x_flag']
+    assert out['Ta_1_flag'].tolist() == [4, 0]
+    assert out['R_x_flag'].tolist() == [4, 0]
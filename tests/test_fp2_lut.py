@@ -0,0 +1,16 @@
+import numpy as np
+
+from unified_script import _FP2_LUT, decode_csi_fs2_float
+
+
+def test_fp2_lut_matches_scalar_decoder():
+    """
+    The lookup table must reproduce decode_csi_fs2_float for every 16-bit pattern,
+    including the +Inf/-Inf/NaN codes and the sign of zero.
+    """
+    raw = np.arange(65536, dtype=np.uint16)
+    expected = np.array([decode_csi_fs2_float(int(v)) for v in raw.astype(np.int16)])
+
+    assert _FP2_LUT.shape == (65536,)
+    assert np.array_equal(_FP2_LUT, expected, equal_nan=True)
+    assert np.array_equal(np.signbit(_FP2_LUT), np.signbit(expected))
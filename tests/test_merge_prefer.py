@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from unified_script import _merge_prefer
+
+
+def _frame(start, periods, columns):
+    index = pd.date_range('2020-01-01', periods=60, freq='30min')[start:start + periods]
+    return pd.DataFrame(columns, index=pd.DatetimeIndex(index, name='TIMESTAMP'))
+
+
+CASES = {
+    'overlapping_float_and_int': (
+        _frame(0, 4, {'a': [1.0, np.nan, 3.0, np.nan], 'f': np.array([0, 1, 0, 2], dtype=np.int8)}),
+        _frame(2, 4, {'a': [30.0, 40.0, 50.0, 60.0], 'f': np.array([5, 5, 5, 5], dtype=np.int64)}),
+    ),
+    'disjoint_indexes': (
+        _frame(0, 3, {'a': [1.0, 2.0, 3.0], 'f': np.array([1, 1, 1], dtype=np.int8)}),
+        _frame(10, 3, {'a': [4.0, np.nan, 6.0], 'f': np.array([2, 2, 2], dtype=np.int8)}),
+    ),
+    'secondary_inside_primary': (
+        _frame(0, 5, {'a': [np.nan] * 5, 'f': np.array([0, 1, 2, 3, 4], dtype=np.int8)}),
+        _frame(1, 2, {'a': [7.0, 8.0], 'f': np.array([9, 9], dtype=np.int64)}),
+    ),
+    'all_nan_columns': (
+        _frame(0, 3, {'a': [np.nan] * 3, 'f': np.array([1, 2, 3], dtype=np.int64)}),
+        _frame(0, 3, {'a': [np.nan] * 3, 'f': [np.nan] * 3, 'g': [np.nan] * 3}),
+    ),
+    'non_matching_columns': (
+        _frame(0, 4, {'a': [1.0, np.nan, 3.0, 4.0], 'p': np.array([1, 2, 3, 4], dtype=np.int8)}),
+        _frame(2, 4, {'a': [9.0, 9.0, 9.0, 9.0], 's': np.array([5, 6, 7, 8], dtype=np.int64),
+                      'b': [np.nan, 1.0, np.nan, 2.0]}),
+    ),
+}
+
+
+@pytest.mark.parametrize('name', list(CASES))
+def test_merge_prefer_matches_combine_first(name):
+    primary, secondary = CASES[name]
+
+    pd.testing.assert_frame_equal(_merge_prefer(primary, secondary), primary.combine_first(secondary),
+                                  check_freq=False)
+
+
+def test_merge_prefer_matches_combine_first_on_random_frames():
+    rng = np.random.default_rng(0)
+    names = [f'c{i}' for i in range(6)]
+
+    def random_frame():
+        n = int(rng.integers(1, 20))
+        columns = {}
+        for col in rng.choice(names, int(rng.integers(1, 6)), replace=False):
+            if rng.random() < 0.4:
+                columns[col] = rng.integers(-5, 5, n).astype(rng.choice(['int8', 'int64']))
+            else:
+                values = rng.normal(size=n)
+                values[rng.random(n) < rng.choice([0.0, 0.3, 1.0])] = np.nan
+                columns[col] = values
+        df = _frame(int(rng.integers(0, 30)), n, columns)
+        return df.sample(frac=1, random_state=int(rng.integers(1000))) if rng.random() < 0.5 else df
+
+    for _ in range(300):
+        primary, secondary = random_frame(), random_frame()
+        pd.testing.assert_frame_equal(_merge_prefer(primary, secondary), primary.combine_first(secondary),
+                                      check_freq=False)
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from unified_script import _parse_timestamp_strings, get_toa5_metadata, read_toa5_data
+
+
+def test_mixed_precision_timestamps_are_kept():
+    """
+    Sub-second rows after whole-second ones are parsed, not dropped. Plain
+    pd.to_datetime(errors='coerce') infers the format from the first row and
+    turned such rows into NaT.
+    """
+    ts = pd.Series(['2020-01-01 00:00:00', '2020-01-01 00:00:00.5', '2020-01-01 00:00:01'])
+
+    parsed = _parse_timestamp_strings(ts)
+
+    assert parsed.tolist() == [pd.Timestamp('2020-01-01 00:00:00'), pd.Timestamp('2020-01-01 00:00:00.5'),
+                               pd.Timestamp('2020-01-01 00:00:01')]
+
+
+def test_non_iso_rows_fall_back_to_coerce():
+    ts = pd.Series(['2020-01-01 00:00:00', 'not a date'])
+
+    parsed = _parse_timestamp_strings(ts)
+
+    assert parsed.iloc[0] == pd.Timestamp('2020-01-01 00:00:00')
+    assert pd.isna(parsed.iloc[1])
+
+
+def test_toa5_keeps_sub_second_row(tmp_path):
+    path = tmp_path / 'station_Table30.dat'
+    path.write_text(
+        '"TOA5","TEST","CR1000","1234","CR1000.Std.32","CPU:test.CR1","1","Table30"\n'
+        '"TIMESTAMP","RECORD","Ta"\n'
+        '"TS","RN","degC"\n'
+        '"","","Avg"\n'
+        '"2020-01-01 00:30:00",0,1.5\n'
+        '"2020-01-01 01:00:00",1,2.5\n'
+        '"2020-01-01 01:30:00.5",2,3.5\n'
+        '"2020-01-01 02:00:00",3,4.5\n',
+        encoding='latin-1')
+
+    df = read_toa5_data(path, get_toa5_metadata(path))
+
+    assert len(df) == 4
+    assert df['TIMESTAMP'].iloc[2] == pd.Timestamp('2020-01-01 01:30:00.5')
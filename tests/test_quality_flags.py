@@ -0,0 +1,98 @@
+import numpy as np
+
+from unified_script import QFInterval, _coalesce_qf_intervals, build_qf_bitmap
+
+
+def _ns(value):
+    return np.datetime64(int(value), 'ns')
+
+
+def _iv(start, end, flag_value, filename_contains=None):
+    return QFInterval(start=_ns(start), end=_ns(end), flag_value=flag_value,
+                      filename_contains=filename_contains)
+
+
+def _sequential_bitmap(intervals, timestamps, fname_masks=None):
+    """Reference: rules applied one by one, a flag is only set where it is still 0."""
+    fname_masks = fname_masks or {}
+    bitmap = np.zeros(len(timestamps), dtype=np.uint8)
+    for iv in intervals:
+        mask = (timestamps >= iv.start) & (timestamps <= iv.end) & (bitmap == 0)
+        if iv.filename_contains:
+            if iv.filename_contains not in fname_masks:
+                continue
+            mask &= fname_masks[iv.filename_contains]
+        bitmap[mask] = iv.flag_value
+    return bitmap
+
+
+def test_coalesce_merges_same_flag_across_non_overlapping_rule():
+    intervals = [_iv(0, 10, 2), _iv(50, 60, 3), _iv(5, 20, 2)]
+
+    merged = _coalesce_qf_intervals(intervals)
+
+    assert merged == (_iv(0, 20, 2), _iv(50, 60, 3))
+    timestamps = np.arange(0, 70, dtype=np.int64).astype('datetime64[ns]')
+    assert np.array_equal(build_qf_bitmap(merged, timestamps), _sequential_bitmap(intervals, timestamps))
+
+
+def test_coalesce_does_not_merge_across_overlapping_rule_with_other_flag():
+    # Point 13 is flagged 3 by the middle rule; merging the last rule into the
+    # first one would let flag 2 win there
+    intervals = [_iv(0, 10, 2), _iv(8, 15, 3), _iv(12, 20, 2)]
+
+    merged = _coalesce_qf_intervals(intervals)
+
+    assert merged == tuple(intervals)
+    timestamps = np.arange(0, 25, dtype=np.int64).astype('datetime64[ns]')
+    expected = _sequential_bitmap(intervals, timestamps)
+    assert expected[13] == 3
+    assert np.array_equal(build_qf_bitmap(merged, timestamps), expected)
+
+
+def _assert_matches_sequential(intervals, timestamps, fname_masks=None):
+    expected = _sequential_bitmap(intervals, timestamps, fname_masks)
+    assert np.array_equal(build_qf_bitmap(tuple(intervals), timestamps, fname_masks), expected)
+    assert np.array_equal(build_qf_bitmap(_coalesce_qf_intervals(intervals), timestamps, fname_masks), expected)
+    return expected
+
+
+def test_build_qf_bitmap_matches_sequential_loop_on_edge_cases():
+    timestamps = np.array([5, 1, 3, 3, 9, -1, 7, 2, 8, 3], dtype=np.int64).astype('datetime64[ns]')
+    timestamps[5] = np.datetime64('NaT')  # unsorted input with a NaT row
+    fname_masks = {'x': np.array([True, False] * 5)}
+    intervals = [
+        _iv(3, 3, 5),                        # point rule on a repeated timestamp
+        _iv(3, 3, 6),                        # same point again - the first one wins
+        _iv(0, 4, 0),                        # flag 0 must not block later rules
+        _iv(2, 8, 1),                        # overlaps everything above
+        _iv(6, 9, 2, filename_contains='x'),
+        _iv(0, 9, 4, filename_contains='missing'),
+        _iv(9, 9, 3),
+    ]
+
+    expected = _assert_matches_sequential(intervals, timestamps, fname_masks)
+
+    assert expected[5] == 0
+    assert expected[2] == expected[3] == expected[9] == 5
+    assert expected[1] == 0 and expected[7] == 1
+    assert expected[6] == 1 and expected[8] == 1
+    assert expected[4] == 2  # only the filename-filtered rule covers timestamp 9 before the point rule
+
+
+def test_build_qf_bitmap_matches_sequential_loop_on_random_rules():
+    rng = np.random.default_rng(0)
+    for case in range(200):
+        timestamps = rng.integers(0, 1000, size=300).astype('datetime64[ns]')
+        if case % 2:
+            timestamps.sort()
+        if case % 3 == 0:
+            timestamps[rng.integers(0, 300, 5)] = np.datetime64('NaT')
+        fname_masks = {'x': rng.random(300) < 0.5}
+        intervals = []
+        for _ in range(rng.integers(1, 15)):
+            start = int(rng.integers(0, 1000))
+            end = start + int(rng.choice([0, rng.integers(0, 200)]))
+            intervals.append(_iv(start, end, int(rng.integers(0, 4)),
+                                 filename_contains=rng.choice([None, 'x', 'y'])))
+        _assert_matches_sequential(intervals, timestamps, fname_masks)
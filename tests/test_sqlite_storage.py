@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import unified_script
+from unified_script import _forget_table_columns, _sqlite_column_values, _sqlite_engine, _table_columns
+
+
+def test_every_datetime_column_is_stored_as_iso_text():
+    df = pd.DataFrame({
+        'TIMESTAMP': pd.to_datetime(['2020-01-01 00:30:00', '2020-01-01 01:00:00']),
+        'logged': pd.to_datetime(['2020-01-02 10:00:00', None]),
+        'logged_utc': pd.to_datetime(['2020-01-02 10:00:00+01:00', '2020-01-02 11:00:00+01:00']),
+        'Ta': [1.5, np.nan],
+    })
+
+    timestamps, logged, logged_utc, ta = _sqlite_column_values(df)
+
+    assert timestamps.tolist() == ['2020-01-01T00:30:00', '2020-01-01T01:00:00']
+    assert logged.tolist() == ['2020-01-02T10:00:00', None]
+    assert logged_utc.tolist() == ['2020-01-02T09:00:00', '2020-01-02T10:00:00']
+    assert ta.tolist() == [1.5, None]
+
+
+def test_schema_cache_key_is_shared_by_path_and_engine(tmp_path, monkeypatch):
+    """A schema cached through a connection is invalidated through the configured (relative) path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(unified_script, '_TABLE_COLUMNS_CACHE', {})
+    db_path = Path('data.sqlite')
+    with _sqlite_engine(db_path).connect() as conn:
+        conn.exec_driver_sql('CREATE TABLE "data_X" (TIMESTAMP TEXT PRIMARY KEY, "Ta" REAL)')
+        assert _table_columns(conn, 'data_X') == {'TIMESTAMP', 'Ta'}
+
+    assert len(unified_script._TABLE_COLUMNS_CACHE) == 1
+    _forget_table_columns(tmp_path / 'data.sqlite', 'data_X')
+    assert unified_script._TABLE_COLUMNS_CACHE == {}
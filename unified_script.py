@@ -40,8 +40,11 @@ Główne funkcjonalności:
 
 Wymagania:
     - Python 3.10+
-    - Biblioteki: pandas, pytest, scipy, tqdm
-      pip install pandas pytest scipy tqdm
+    - Biblioteki: pandas, scipy, sqlalchemy, tqdm
+      (scipy i sqlalchemy importowane dopiero przy odczycie .MAT / zapisie do SQLite)
+      pip install pandas scipy sqlalchemy tqdm
+    - Opcjonalnie: numba (kompilacja gorących pętli numerycznych, np. flag zakresowych)
+    - Opcjonalnie: pyarrow (wielowątkowy zapis plików CSV)
 
 Uruchamianie:
     Skrypt należy uruchamiać z wiersza poleceń.
@@ -79,38 +82,74 @@ Uruchamianie:
 """
 
 import argparse
+import functools
 import json
 import logging
 import math
+import mmap
 import multiprocessing
 import os
 import re
 import sqlite3
-import sqlalchemy  # pyright: ignore[reportMissingImports]
 import struct
+import sys
 import tempfile
+import traceback
 from collections import defaultdict
-from datetime import datetime, timedelta, UTC
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone, UTC
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Optional, Union
 import numpy as np  # pyright: ignore[reportMissingImports]
 import pandas as pd  # pyright: ignore[reportMissingImports]
-import pytest  # pyright: ignore[reportMissingImports]
-from scipy.io import loadmat  # pyright: ignore[reportMissingImports]
 from tqdm import tqdm  # pyright: ignore[reportMissingModuleSource]
 
+# Opcjonalnie: Numba do kompilacji gorących pętli numerycznych (brak -> ścieżka NumPy)
+try:
+    from numba import njit, prange  # pyright: ignore[reportMissingImports]
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Opcjonalnie: pyarrow jako parser odczytu CSV (brak -> silnik C)
+try:
+    import pyarrow  # noqa: F401  # pyright: ignore[reportMissingImports]
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Opcjonalnie: orjson do (de)serializacji cache (brak -> moduł json)
+try:
+    import orjson  # pyright: ignore[reportMissingImports]
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # import słowników config
 from config import *
 
 # --- Globalne definicje ---
 CAMPBELL_EPOCH = pd.Timestamp('1990-01-01 00:00:00')
+CAMPBELL_EPOCH_NS = np.int64(CAMPBELL_EPOCH.as_unit('ns').value)
 STRUCT_FORMAT_MAP = {'ULONG':'L', 'IEEE4':'f', 'IEEE8':'d', 'LONG':'l', 'BOOL':'?', 'SHORT':'h', 'USHORT':'H', 'BYTE':'b'}
 BASE_DIR = Path(__file__).parent
 LOGS_DIR = BASE_DIR / 'logs'
 CACHE_FILE_PATH = LOGS_DIR / ".cache_split.json"
 LOG_FILE_PATH = LOGS_DIR / "log_split.txt"
 CHRONOLOGY_LOG_FILENAME = LOGS_DIR / "log_chronology_correction.txt"
+# Bezpośrednie mapowanie grupa -> słownik zmiany nazw kolumn (jedno wyszukiwanie zamiast dwóch)
+GROUP_TO_COLUMN_MAP = {
+    group_id: MappingProxyType(COLUMN_MAPPING_RULES[ruleset_name])
+    for group_id, ruleset_name in STATION_MAPPING_FOR_COLUMNS.items()
+    if ruleset_name in COLUMN_MAPPING_RULES
+}
+# Zbiory nazw źródłowych per grupa - ramka bez żadnej z nich nie wymaga przebudowy indeksu kolumn
+GROUP_TO_COLUMN_KEYS = {group_id: frozenset(mapping) for group_id, mapping in GROUP_TO_COLUMN_MAP.items()}
+# Identyfikator stacji (prefiks przed pierwszym '_') dla znanych grup
+GROUP_TO_STATION_ID = MappingProxyType({group_id: group_id.split('_', 1)[0] for group_id in STATION_MAPPING_FOR_QC})
 chronology_logger = None
 
 # --- MODUŁY POMOCNICZE I LOGOWANIA ---
@@ -143,20 +182,25 @@ def setup_logging(level: str = 'INFO'):
     root_logger.addHandler(console_handler)
 
 def load_cache() -> Dict[str, Any]:
-    """Wczytuje cache przetworzonych plików."""
+    """Wczytuje cache przetworzonych plików (JSON; także starszy, wcięty format)."""
     if CACHE_FILE_PATH.exists():
         try:
-            with open(CACHE_FILE_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
+            with open(CACHE_FILE_PATH, 'rb') as f:
+                raw = f.read()
+            return orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+        except (ValueError, IOError):
             pass
     return {}
 
 def save_cache(data: Dict[str, Any]):
-    """Zapisuje cache przetworzonych plików."""
+    """Zapisuje cache przetworzonych plików jako zwarty JSON (bez wcięć)."""
     try:
-        with open(CACHE_FILE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4)
+        if ORJSON_AVAILABLE:
+            raw = orjson.dumps(data)
+        else:
+            raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+        with open(CACHE_FILE_PATH, 'wb') as f:
+            f.write(raw)
     except IOError as e:
         logging.error(f"Nie można zapisać pliku cache: {e}")
 
@@ -168,11 +212,14 @@ def is_file_in_cache(file_path: Path, cache: dict[str, any]) -> bool:
     try:
         file_stat = file_path.stat()
         cached_info = cache[file_key]
-        if cached_info.get('mtime') == file_stat.st_mtime and cached_info.get('size') == file_stat.st_size:
-            return True
+        if cached_info.get('size') != file_stat.st_size:
+            return False
+        # Całkowite nanosekundy (wpisy starszego formatu mają tylko 'mtime' jako float)
+        if 'mtime_ns' in cached_info:
+            return cached_info['mtime_ns'] == file_stat.st_mtime_ns
+        return cached_info.get('mtime') == file_stat.st_mtime
     except FileNotFoundError:
         return False
-    return False
 
 def update_cache(processed_files: list[Path], cache: dict[str, any]):
     """Aktualizuje słownik cache o informacje o przetworzonych plikach."""
@@ -181,6 +228,7 @@ def update_cache(processed_files: list[Path], cache: dict[str, any]):
             file_stat = file_path.stat()
             cache[str(file_path)] = {
                 'mtime': file_stat.st_mtime,
+                'mtime_ns': file_stat.st_mtime_ns,
                 'size': file_stat.st_size,
                 'processed_at': datetime.now().isoformat()
             }
@@ -220,6 +268,8 @@ def initialize_database(db_path: Path):
         
         # Enable foreign key support
         cursor.execute("PRAGMA foreign_keys = ON;")
+        # Dziennik WAL jest trwały dla pliku bazy - zapisy nie blokują odczytów i są szybsze
+        cursor.execute("PRAGMA journal_mode = WAL;")
 
         # Tabela stacji (unikalne lokalizacje)
         cursor.execute("""
@@ -248,40 +298,215 @@ def initialize_database(db_path: Path):
         logging.error(f"Nie można zainicjalizować bazy danych: {e}")
         raise
 
+# Silniki SQLAlchemy per plik bazy (w obrębie procesu); pula połączeń jest współdzielona
+# między kolejnymi zapisami zamiast tworzenia silnika przy każdym pliku.
+_SQLITE_ENGINES: Dict[str, Any] = {}
+
+def _db_key(db_path) -> str:
+    """
+    Klucz pliku bazy we wszystkich pamięciach podręcznych (silniki, schematy tabel,
+    zarejestrowane grupy): ścieżka bezwzględna, ta sama dla Path z konfiguracji
+    i dla conn.engine.url.database.
+    """
+    return os.path.abspath(os.fspath(db_path))
+
+def _sqlite_engine(db_path):
+    """Zwraca (tworząc przy pierwszym użyciu) silnik SQLAlchemy dla pliku bazy."""
+    key = _db_key(db_path)
+    engine = _SQLITE_ENGINES.get(key)
+    if engine is None:
+        import sqlalchemy  # pyright: ignore[reportMissingImports]
+        engine = sqlalchemy.create_engine(f"sqlite:///{db_path}")
+        _SQLITE_ENGINES[key] = engine
+    return engine
+
+# Znane kolumny tabel danych per (plik bazy, tabela). Kolumny są tylko dodawane,
+# więc zbiór z pamięci podręcznej nigdy nie zawiera kolumny, której nie ma w bazie.
+_TABLE_COLUMNS_CACHE: Dict[tuple, set] = {}
+
+def _table_columns(conn, table_name: str, refresh: bool = False) -> set:
+    """Zbiór kolumn tabeli; inspekcja schematu tylko przy pierwszym użyciu lub odświeżeniu."""
+    import sqlalchemy  # pyright: ignore[reportMissingImports]
+    key = (_db_key(conn.engine.url.database), table_name)
+    columns = None if refresh else _TABLE_COLUMNS_CACHE.get(key)
+    if columns is None:
+        inspector = sqlalchemy.inspect(conn)
+        columns = {col['name'] for col in inspector.get_columns(table_name)}
+        _TABLE_COLUMNS_CACHE[key] = columns
+    return columns
+
+# Grupy (plik bazy, group_id), których wpisy w tabelach stations/groups już zapisano;
+# kolejne zapisy tej grupy pomijają transakcję metadanych.
+_REGISTERED_GROUPS: set = set()
+
+def _forget_table_columns(db_path, table_name: str):
+    """Unieważnia zapamiętany schemat tabeli (np. po błędzie zapisu)."""
+    _TABLE_COLUMNS_CACHE.pop((_db_key(db_path), table_name), None)
+
+_is_integer_dtype = pd.api.types.is_integer_dtype
+_is_numeric_dtype = pd.api.types.is_numeric_dtype
+
+def _sqlite_column_type(col: str, dtype) -> str:
+    """Typ kolumny SQLite dla kolumny ramki: flagi i liczby całkowite INTEGER, liczby REAL, reszta TEXT."""
+    if col.endswith('_flag') or _is_integer_dtype(dtype):
+        return "INTEGER"
+    if _is_numeric_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
 def add_missing_columns(df: pd.DataFrame, conn, table_name: str):
     """
     Dynamicznie dodaje brakujące kolumny do określonej tabeli, używając SQLAlchemy.
     Wersja 7.24: Usunięto zagnieżdżoną transakcję, aby uniknąć błędu InvalidRequestError.
+    Schemat tabeli jest zapamiętywany; ponowna inspekcja tylko, gdy ALTER TABLE się nie powiedzie
+    (np. kolumnę dodał w międzyczasie inny proces).
     """
+    import sqlalchemy  # pyright: ignore[reportMissingImports]
     try:
-        inspector = sqlalchemy.inspect(conn)
-        existing_cols_info = inspector.get_columns(table_name)
-        existing_cols = {col['name'] for col in existing_cols_info}
-        
-        missing_cols = set(df.columns) - existing_cols
+        for refresh in (False, True):
+            existing_cols = _table_columns(conn, table_name, refresh=refresh)
+            missing_cols = set(df.columns) - existing_cols
 
-        if not missing_cols:
-            return
+            if not missing_cols:
+                return
 
-        # Usunięto blok 'with conn.begin()'. Operacje wykonają się w transakcji nadrzędnej.
-        for col in missing_cols:
-            if col.endswith('_flag'):
-                sql_type = "INTEGER"
-            elif pd.api.types.is_integer_dtype(df[col]):
-                sql_type = "INTEGER"
-            elif pd.api.types.is_numeric_dtype(df[col]):
-                sql_type = "REAL"
-            else:
-                sql_type = "TEXT"
-            
-            alter_sql = sqlalchemy.text(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" {sql_type}')
-            conn.execute(alter_sql)
-            logging.debug(f"Dodano nową kolumnę '{col}' do tabeli '{table_name}'")
+            try:
+                # Usunięto blok 'with conn.begin()'. Operacje wykonają się w transakcji nadrzędnej.
+                for col in missing_cols:
+                    sql_type = _sqlite_column_type(col, df[col].dtype)
+                    alter_sql = sqlalchemy.text(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" {sql_type}')
+                    conn.execute(alter_sql)
+                    existing_cols.add(col)
+                    logging.debug("Dodano nową kolumnę '%s' do tabeli '%s'", col, table_name)
+                return
+            except sqlalchemy.exc.OperationalError:
+                if refresh:
+                    raise
 
     except Exception as e:
+        _forget_table_columns(conn.engine.url.database, table_name)
         logging.error(f"Nie udało się dodać kolumn do tabeli '{table_name}': {e}")
         raise
 
+SQLITE_INSERT_CHUNK_ROWS = 10_000
+
+def _sqlite_timestamp_text(ts: pd.Series) -> np.ndarray:
+    """
+    Klucze TIMESTAMP tabel danych ('%Y-%m-%dT%H:%M:%S', strefa -> UTC) jako tablica
+    obiektów, sformatowane wektorowo w NumPy zamiast strftime per wiersz; NaT -> None.
+    """
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_convert('UTC').dt.tz_localize(None)
+    values = ts.to_numpy().astype('datetime64[s]')
+    text = np.datetime_as_string(values).astype(object)
+    text[np.isnat(values)] = None
+    return text
+
+def _sqlite_column_values(df: pd.DataFrame) -> list:
+    """
+    Kolumny ramki jako tablice obiektów gotowe dla executemany: TIMESTAMP i pozostałe
+    kolumny dat jako tekst ISO 8601 ('%Y-%m-%dT%H:%M:%S') - bez domyślnego adaptera
+    datetime modułu sqlite3 (przestarzałego od Pythona 3.12), wartości jako typy
+    Pythona, braki jako None.
+    """
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        if series.dtype.kind == 'M':
+            values = _sqlite_timestamp_text(series)
+        else:
+            values = series.to_numpy(dtype=object)
+        values[series.isna().to_numpy()] = None
+        columns.append(values)
+    return columns
+
+def _bulk_upsert_sqlite(df: pd.DataFrame, conn, table_name: str):
+    """
+    INSERT OR REPLACE całej ramki przez executemany w porcjach, w transakcji połączenia.
+    Krotki wierszy powstają porcjami, więc w pamięci jest naraz tylko jedna porcja.
+    Wiersze idą w kolejności klucza TIMESTAMP (sortowanie stabilne - przy powtórzonym
+    kluczu nadal wygrywa późniejszy wiersz), co ogranicza podziały stron B-drzewa.
+    """
+    if 'TIMESTAMP' in df.columns and not df['TIMESTAMP'].is_monotonic_increasing:
+        df = df.sort_values('TIMESTAMP', kind='mergesort', ignore_index=True)
+    columns_str = ", ".join([f'"{c}"' for c in df.columns])
+    placeholders = ", ".join(["?"] * len(df.columns))
+    upsert_sql = f'INSERT OR REPLACE INTO "{table_name}" ({columns_str}) VALUES ({placeholders})'
+    columns = _sqlite_column_values(df)
+    for i in range(0, len(df), SQLITE_INSERT_CHUNK_ROWS):
+        rows = list(zip(*(values[i:i + SQLITE_INSERT_CHUNK_ROWS] for values in columns)))
+        conn.exec_driver_sql(upsert_sql, rows)
+
+def _merge_prefer(primary: pd.DataFrame, secondary: pd.DataFrame) -> pd.DataFrame:
+    """
+    Wynik jak primary.combine_first(secondary) (wartości z primary mają pierwszeństwo,
+    braki uzupełniane z secondary). Dla unikalnych indeksów i kolumn wyłącznie
+    float64/całkowitych łączy obie ramki jednym np.where na wspólnej siatce zamiast
+    pętli kolumnowej combine_first; w pozostałych przypadkach deleguje do combine_first.
+    """
+    def fast_dtype(dt) -> bool:
+        return dt == np.float64 or dt.kind == 'i'
+
+    if (primary.empty or secondary.empty
+            or not (primary.index.is_unique and secondary.index.is_unique)
+            or not (primary.columns.is_unique and secondary.columns.is_unique)
+            or not all(fast_dtype(dt) for dt in primary.dtypes)
+            or not all(fast_dtype(dt) for dt in secondary.dtypes)):
+        return primary.combine_first(secondary)
+
+    # align wyznacza wspólny indeks (łącznie z jednostką czasu) dokładnie tak jak combine_first
+    left, right = primary.align(secondary, join='outer', axis=0)
+    index = left.index
+    columns = primary.columns.union(secondary.columns, sort=False)
+    left = left.reindex(columns=columns).to_numpy(dtype=np.float64)
+    right = right.reindex(columns=columns).to_numpy(dtype=np.float64)
+    merged = pd.DataFrame(np.where(np.isnan(left), right, left), index=index, columns=columns)
+
+    # Typy jak w combine_first: całkowity zostaje tylko tam, gdzie nie mogły pojawić się braki
+    primary_full = len(index) == len(primary)
+    secondary_full = len(index) == len(secondary)
+    int_columns = {}
+    for col in columns:
+        p_dtype = primary.dtypes[col] if col in primary.columns else None
+        # Kolumna secondary bez żadnej wartości nie zmienia kolumny primary (jak w combine)
+        s_dtype = secondary.dtypes[col] if col in secondary.columns and secondary[col].notna().any() else None
+        if p_dtype is not None and s_dtype is not None:
+            if p_dtype.kind == 'i' and s_dtype.kind == 'i':
+                int_columns[col] = np.result_type(p_dtype, s_dtype)
+        elif p_dtype is not None:
+            if primary_full and p_dtype.kind == 'i':
+                int_columns[col] = p_dtype
+        elif secondary_full and s_dtype is not None and s_dtype.kind == 'i':
+            int_columns[col] = s_dtype
+    return merged.astype(int_columns) if int_columns else merged
+
+def _rows_after_table_end(conn, table_name: str, timestamps: list) -> bool:
+    """
+    True, gdy wszystkie klucze są późniejsze niż MAX(TIMESTAMP) tabeli (albo tabela jest pusta):
+    zapis samych nowych wierszy, bez odczytu i scalania istniejących. Klucz główny jest
+    indeksem, więc MAX to jedno zejście po B-drzewie; teksty ISO 8601 porównują się jak daty.
+    """
+    try:
+        max_ts = conn.exec_driver_sql(f'SELECT MAX(TIMESTAMP) FROM "{table_name}"').scalar()
+    except Exception:
+        return False
+    return max_ts is None or max_ts < min(timestamps)
+
+def _read_rows_by_timestamp(conn, table_name: str, timestamps: list) -> pd.DataFrame:
+    """
+    Odczytuje wiersze tabeli o podanych kluczach TIMESTAMP jednym zapytaniem: klucze
+    trafiają (executemany) do tymczasowej tabeli z kluczem głównym, a dane są pobierane
+    złączeniem z nią - bez dzielenia listy na porcje pod limit parametrów SQLite.
+    """
+    conn.exec_driver_sql('CREATE TEMP TABLE IF NOT EXISTS _ts_probe (TIMESTAMP TEXT PRIMARY KEY)')
+    try:
+        conn.exec_driver_sql('INSERT OR IGNORE INTO _ts_probe (TIMESTAMP) VALUES (?)',
+                             [(ts,) for ts in timestamps])
+        query = f'SELECT d.* FROM "{table_name}" d JOIN _ts_probe p ON d.TIMESTAMP = p.TIMESTAMP'
+        return pd.read_sql_query(query, conn)
+    finally:
+        conn.exec_driver_sql('DROP TABLE IF EXISTS temp._ts_probe')
+
 def save_dataframe_to_sqlite(df: pd.DataFrame, config: dict, lock: multiprocessing.Lock):
     """
     Zapisuje dane do bazy SQLite, zapewniając poprawny format TIMESTAMP dla zewnętrznych narzędzi.
@@ -289,99 +514,105 @@ def save_dataframe_to_sqlite(df: pd.DataFrame, config: dict, lock: multiprocessi
     """
     if df.empty:
         return
+    import sqlalchemy  # pyright: ignore[reportMissingImports]
 
     group_id = config['file_id']
     db_path = Path(config['db_path'])
     overwrite_mode = config.get('overwrite', False)
     coords = STATION_COORDINATES.get(group_id, {'lat': None, 'lon': None})
-    station_id = group_id.split('_')[0]
+    station_id = GROUP_TO_STATION_ID.get(group_id) or group_id.split('_', 1)[0]
     table_name = f"data_{group_id}"
-    temp_table_name = f"temp_{group_id}"
 
     with lock:
         try:
-            engine = sqlalchemy.create_engine(f"sqlite:///{db_path}")
+            engine = _sqlite_engine(db_path)
             with engine.connect() as conn:
-                
+                conn.exec_driver_sql("PRAGMA synchronous = NORMAL")
+                conn.exec_driver_sql("PRAGMA temp_store = MEMORY")
+
                 # Krok 1: Wstępne oczyszczenie i przygotowanie nowych danych
                 df_clean = _enforce_numeric_types(df.copy())
 
                 # Krok 2: Utworzenie tabeli docelowej, jeśli nie istnieje
-                if not conn.dialect.has_table(conn, table_name):
+                table_known = (_db_key(db_path), table_name) in _TABLE_COLUMNS_CACHE
+                if not table_known and not conn.dialect.has_table(conn, table_name):
                     # Zdefiniuj schemat na podstawie CZYSTYCH danych wejściowych
-                    cols_with_types = [f'"{col}" {("INTEGER" if col.endswith("_flag") or pd.api.types.is_integer_dtype(dtype) else "REAL" if pd.api.types.is_numeric_dtype(dtype) else "TEXT")}' 
+                    cols_with_types = [f'"{col}" {_sqlite_column_type(col, dtype)}'
                                        for col, dtype in df_clean.dtypes.items() if col != 'TIMESTAMP']
                     create_sql = f'CREATE TABLE "{table_name}" (TIMESTAMP TEXT PRIMARY KEY, {", ".join(cols_with_types)})'
                     conn.execute(sqlalchemy.text(create_sql))
                     conn.commit()
+                    _TABLE_COLUMNS_CACHE[(_db_key(db_path), table_name)] = set(df_clean.columns)
                     logging.info(f"Utworzono nową tabelę danych: {table_name}")
                 
                 # Krok 3: Odczytaj istniejące dane z bazy
                 existing_df = pd.DataFrame()
-                timestamps_to_check = df_clean['TIMESTAMP'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist()
-                if timestamps_to_check:
-                    chunk_size = 900
-                    all_existing_dfs = []
-                    for i in range(0, len(timestamps_to_check), chunk_size):
-                        chunk_ts = timestamps_to_check[i:i + chunk_size]
-                        placeholders = ", ".join([f"'{ts}'" for ts in chunk_ts])
-                        query = f'SELECT * FROM "{table_name}" WHERE TIMESTAMP IN ({placeholders})'
-                        try:
-                           chunk = pd.read_sql_query(query, conn)
-                           chunk['TIMESTAMP'] = pd.to_datetime(chunk['TIMESTAMP'])
-                           all_existing_dfs.append(chunk)
-                        except Exception: # Błąd jeśli tabela jest pusta lub odpytanie nie zadziała
-                            pass 
-                    if all_existing_dfs:
-                        non_empty_dfs = [df for df in all_existing_dfs if not df.empty]
-                        if non_empty_dfs:
-                            existing_df = pd.concat(non_empty_dfs, ignore_index=True)
+                # Klucze formatowane wektorowo; jedno złączenie z tymczasową tabelą kluczy
+                timestamps_to_check = [ts for ts in _sqlite_timestamp_text(df_clean['TIMESTAMP']) if ts is not None]
+                if timestamps_to_check and not _rows_after_table_end(conn, table_name, timestamps_to_check):
+                    try:
+                        existing_df = _read_rows_by_timestamp(conn, table_name, timestamps_to_check)
+                        existing_df['TIMESTAMP'] = pd.to_datetime(existing_df['TIMESTAMP'])
+                    except Exception: # Błąd jeśli tabela jest pusta lub odpytanie nie zadziała
+                        existing_df = pd.DataFrame()
 
                 # Krok 4: Połącz dane zgodnie z trybem i ponownie oczyść typy
                 if not existing_df.empty:
                     df_indexed = df_clean.set_index('TIMESTAMP')
                     existing_df_indexed = existing_df.set_index('TIMESTAMP')
                     if overwrite_mode:
-                        merged_df = df_indexed.combine_first(existing_df_indexed)
+                        merged_df = _merge_prefer(df_indexed, existing_df_indexed)
                     else:
-                        merged_df = existing_df_indexed.combine_first(df_indexed)
-                    df_to_save = merged_df.reset_index()
+                        merged_df = _merge_prefer(existing_df_indexed, df_indexed)
+                    df_to_save = _enforce_numeric_types(merged_df.reset_index())
                 else:
-                    df_to_save = df_clean.copy()
-                
-                df_to_save = _enforce_numeric_types(df_to_save)
-                add_missing_columns(df_to_save, conn, table_name)
-
-                # Krok 5: Zapisz dane do tabeli tymczasowej
-                dtype_map = {col: sqlalchemy.types.Integer for col in df_to_save.columns if col.endswith('_flag')}
-                df_to_save.to_sql(temp_table_name, conn, if_exists='replace', index=False, dtype=dtype_map, chunksize=2000)
-
-                # --- POCZĄTEK KLUCZOWEJ ZMIANY ---
-                # Krok 6: Sformatuj TIMESTAMP na TEXT Zgodny z ISO 8601 w tabeli tymczasowej
-                format_sql = f'UPDATE "{temp_table_name}" SET TIMESTAMP = strftime("%Y-%m-%dT%H:%M:%S", TIMESTAMP);'
-                conn.execute(sqlalchemy.text(format_sql))
-                # --- KONIEC KLUCZOWEJ ZMIANY ---
+                    # df_clean przeszedł już _enforce_numeric_types w kroku 1
+                    df_to_save = df_clean
 
-                # Krok 7: Wykonaj operację INSERT OR REPLACE
-                columns_str = ", ".join([f'"{c}"' for c in df_to_save.columns])
-                upsert_sql = f'INSERT OR REPLACE INTO "{table_name}" ({columns_str}) SELECT {columns_str} FROM "{temp_table_name}"'
-                conn.execute(sqlalchemy.text(upsert_sql))
+                add_missing_columns(df_to_save, conn, table_name)
 
-                # Krok 8: Usuń tabelę tymczasową
-                conn.execute(sqlalchemy.text(f'DROP TABLE "{temp_table_name}"'))
+                # Krok 5: Zapisz dane jednym executemany (INSERT OR REPLACE) w porcjach,
+                # z TIMESTAMP już sformatowanym jako TEXT zgodny z ISO 8601
+                _bulk_upsert_sqlite(df_to_save, conn, table_name)
                 conn.commit()
 
-                # Krok 9: Zaktualizuj tabele metadanych
-                with conn.begin():
-                    conn.execute(sqlalchemy.text("INSERT OR IGNORE INTO stations (station_id, name, latitude, longitude) VALUES (:sid, :name, :lat, :lon)"), 
-                                   {"sid": station_id, "name": station_id, "lat": coords['lat'], "lon": coords['lon']})
-                    conn.execute(sqlalchemy.text("INSERT OR IGNORE INTO groups (group_id, station_id, interval) VALUES (:gid, :sid, :intv)"), 
-                                   {"gid": group_id, "sid": station_id, "intv": config.get('interval', 'N/A')})
+                # Krok 9: Zaktualizuj tabele metadanych (INSERT OR IGNORE - raz na grupę i bazę w procesie)
+                metadata_key = (_db_key(db_path), group_id)
+                if metadata_key not in _REGISTERED_GROUPS:
+                    with conn.begin():
+                        conn.execute(sqlalchemy.text("INSERT OR IGNORE INTO stations (station_id, name, latitude, longitude) VALUES (:sid, :name, :lat, :lon)"), 
+                                       {"sid": station_id, "name": station_id, "lat": coords['lat'], "lon": coords['lon']})
+                        conn.execute(sqlalchemy.text("INSERT OR IGNORE INTO groups (group_id, station_id, interval) VALUES (:gid, :sid, :intv)"), 
+                                       {"gid": group_id, "sid": station_id, "intv": config.get('interval', 'N/A')})
+                    _REGISTERED_GROUPS.add(metadata_key)
                 
                 logging.info(f"Zapisano/zaktualizowano {len(df_to_save)} wierszy w tabeli '{table_name}'.")
         except Exception as e:
+            _forget_table_columns(db_path, table_name)
+            _REGISTERED_GROUPS.discard((_db_key(db_path), group_id))
             logging.error(f"Krytyczny błąd zapisu do bazy danych dla grupy '{group_id}': {e}", exc_info=True)
             
+def _write_csv(df: pd.DataFrame, output_filepath: Path):
+    """
+    Zapisuje ramkę do CSV zawsze przez DataFrame.to_csv. Zapis przez pyarrow.csv zmieniał
+    format pliku (cudzysłowy, '1.0' -> '1', inne kolumny dat bez date_format) i nie
+    przyjmował kolumn object o mieszanych typach, więc nie jest używany.
+    """
+    df.to_csv(output_filepath, index=False, date_format='%Y-%m-%d %H:%M:%S')
+
+def _read_csv_for_merge(path: Path) -> pd.DataFrame:
+    """
+    Wczytuje istniejący plik CSV grupy z TIMESTAMP jako datetime: wielowątkowym parserem
+    pyarrow, gdy jest dostępny (typy kolumn jak z silnika C, TIMESTAMP czytany jako tekst
+    i parsowany tak samo), w przeciwnym razie silnikiem C.
+    """
+    df = _read_csv_pyarrow(path, dtype={'TIMESTAMP': str})
+    if df is not None:
+        if 'TIMESTAMP' in df.columns:
+            df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'])
+        return df
+    return pd.read_csv(path, parse_dates=['TIMESTAMP'], low_memory=False)
+
 def save_dataframe_to_csv(final_df: pd.DataFrame, year: int, config: dict, lock: multiprocessing.Lock):
     """
     Zapisuje ramkę danych do pliku CSV z logiką 'uzupełnij' lub 'nadpisz'.
@@ -402,7 +633,7 @@ def save_dataframe_to_csv(final_df: pd.DataFrame, year: int, config: dict, lock:
             existing_df = pd.DataFrame()
             if output_filepath.exists():
                 try:
-                    temp_df = pd.read_csv(output_filepath, parse_dates=['TIMESTAMP'], low_memory=False)
+                    temp_df = _read_csv_for_merge(output_filepath)
                     if 'TIMESTAMP' in temp_df.columns:
                         existing_df = temp_df
                 except Exception:
@@ -414,9 +645,9 @@ def save_dataframe_to_csv(final_df: pd.DataFrame, year: int, config: dict, lock:
                 existing_df_indexed = existing_df.set_index('TIMESTAMP')
 
                 if overwrite_mode:
-                    merged_df = df_indexed.combine_first(existing_df_indexed)
+                    merged_df = _merge_prefer(df_indexed, existing_df_indexed)
                 else:
-                    merged_df = existing_df_indexed.combine_first(df_indexed)
+                    merged_df = _merge_prefer(existing_df_indexed, df_indexed)
                 
                 df_to_save = merged_df.reset_index()
             else:
@@ -429,7 +660,7 @@ def save_dataframe_to_csv(final_df: pd.DataFrame, year: int, config: dict, lock:
             df_to_save.sort_values(by='TIMESTAMP', inplace=True)
 
             logging.info(f"Zapisywanie {len(df_to_save)} wierszy do pliku CSV: {output_filepath}")
-            df_to_save.to_csv(output_filepath, index=False, date_format='%Y-%m-%d %H:%M:%S')
+            _write_csv(df_to_save, output_filepath)
 
         except Exception as e:
             logging.error(f"Błąd podczas zapisu do pliku CSV {output_filepath}: {e}", exc_info=True)
@@ -449,6 +680,49 @@ def decode_csi_fs2_float(raw_short_int_le: int) -> float:
     if is_negative and mantissa_val!=0:rtn*=-1.0
     return rtn
     
+def _build_fp2_lut() -> np.ndarray:
+    """
+    Tablica 65536 wartości FP2 indeksowana surowym słowem uint16 (little-endian),
+    liczona tą samą arytmetyką co decode_csi_fs2_float (kolejne dzielenia przez 10.0).
+    """
+    raw = np.arange(65536, dtype=np.uint32)
+    fs_word = ((raw & 0xFF) << 8) | ((raw >> 8) & 0xFF)
+    mantissa = (fs_word & 0x1FFF).astype(np.float64)
+    exponent = (fs_word & 0x6000) >> 13
+    lut = mantissa.copy()
+    for step in range(1, 4):
+        lut = np.where(exponent >= step, lut / 10.0, lut)
+    lut = np.where((fs_word & 0x8000) != 0, -lut, lut)
+    lut[mantissa == 0] = 0.0
+    lut[fs_word == 0x1FFF] = np.inf
+    lut[fs_word == 0x9FFF] = -np.inf
+    lut[fs_word == 0x9FFE] = np.nan
+    return lut
+
+_FP2_LUT = _build_fp2_lut()
+
+# Od tej liczby wartości kolumna FP2 dekodowana jest jądrem Numba (bez tablic pośrednich)
+_NUMBA_FP2_THRESHOLD = 1_000_000
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _fp2_decode_kernel(raw, lut, out):
+        """Pobranie z tablicy FP2 dla każdego surowego słowa (int16 -> indeks 0..65535), równolegle."""
+        for i in prange(raw.shape[0]):
+            out[i] = lut[raw[i] & 0xFFFF]
+
+def _decode_fp2(raw: np.ndarray) -> np.ndarray:
+    """
+    Dekoduje kolumnę surowych słów FP2 przez _FP2_LUT. Dla dużych kolumn (i dostępnej Numby)
+    jedna równoległa pętla czyta pole rekordu wprost i zapisuje tylko tablicę wynikową;
+    w przeciwnym razie astype(uint16) + take.
+    """
+    if NUMBA_AVAILABLE and raw.shape[0] >= _NUMBA_FP2_THRESHOLD:
+        out = np.empty(raw.shape[0], dtype=np.float64)
+        _fp2_decode_kernel(raw, _FP2_LUT, out)
+        return out
+    return _FP2_LUT.take(raw.astype(np.uint16))
+
 def get_tob1_metadata(file_path):
     try:
         with open(file_path,'r',encoding='latin-1')as f:header_lines=[f.readline().strip()for _ in range(5)]
@@ -473,61 +747,88 @@ def get_tob1_metadata(file_path):
         return actual_col_names_to_use,final_struct_pattern,5,fp2_column_names
     except Exception:return None
 
+# Kody formatu struct (bez wyrównania, '<') -> typ numpy pola rekordu TOB1
+_STRUCT_TO_NUMPY = {'L': '<u4', 'l': '<i4', 'f': '<f4', 'd': '<f8', '?': '?', 'h': '<i2', 'H': '<u2', 'b': 'i1'}
+_STRUCT_TOKEN_RE = re.compile(r'(\d+)s|([A-Za-z?])')
+
+def _tob1_record_dtype(struct_pattern: str) -> np.dtype:
+    """Złożony typ numpy opisujący jeden rekord TOB1 (pola f0..fN w kolejności wzorca struct)."""
+    fields = []
+    for i, (length, code) in enumerate(_STRUCT_TOKEN_RE.findall(struct_pattern.lstrip('<'))):
+        # Pola ASCII jako 'V' - zachowują końcowe bajty zerowe tak jak struct.unpack
+        fields.append((f'f{i}', f'V{length}' if length else _STRUCT_TO_NUMPY[code]))
+    return np.dtype(fields)
+
+def _tob1_columns(arr: np.ndarray, col_names: list, fp2_cols: list) -> dict:
+    """Kopiuje pola rekordów TOB1 do kolumn ramki (żadna kolumna nie trzyma widoku na bufor pliku)."""
+    fp2_set = set(fp2_cols)
+    columns = {}
+    for i, col_name in enumerate(col_names):
+        field = arr[f'f{i}']
+        kind = field.dtype.kind
+        if col_name in fp2_set:
+            # FP2: pobranie z tablicy zamiast dekodera wywoływanego per wartość
+            columns[col_name] = _decode_fp2(field)
+        elif kind == 'V':
+            columns[col_name] = pd.Series([v.tobytes() for v in field], dtype=object)
+        elif kind == 'f':
+            # struct.unpack zwracał float Pythona - float64 daje identyczne wartości
+            columns[col_name] = field.astype(np.float64)
+        elif kind in 'iu':
+            columns[col_name] = field.astype(np.int64)
+        else:
+            columns[col_name] = field.copy()
+    return columns
+
 def read_tob1_data(file_path: Path, metadata: tuple) -> pd.DataFrame:
     """
-    (Wersja 2.1) Zawiera poprawkę na błąd typu danych przekazywanych
-    do dekodera FP2, co zapewnia stabilność przy przetwarzaniu binarnym.
+    (Wersja 3.1) Rekordy dekodowane jednym np.frombuffer ze złożonym typem
+    bezpośrednio z pliku zmapowanego w pamięci (mmap), bez kopii całego pliku;
+    znaczniki czasu liczone wektorowo.
     """
     col_names, struct_pattern, num_header_lines, fp2_cols = metadata
-    all_chunks = []
     try:
         record_size = struct.calcsize(struct_pattern)
         if record_size == 0: return pd.DataFrame()
+        record_dtype = _tob1_record_dtype(struct_pattern)
 
         with open(file_path, 'rb') as f:
             for _ in range(num_header_lines): f.readline()
-            
-            chunk_size_rows = 100_000
-            while True:
-                records_in_chunk = []
-                for _ in range(chunk_size_rows):
-                    chunk_bytes = f.read(record_size)
-                    if not chunk_bytes or len(chunk_bytes) < record_size:
-                        break
-                    records_in_chunk.append(struct.unpack(struct_pattern, chunk_bytes))
-
-                if not records_in_chunk: break
-
-                chunk_df = pd.DataFrame(records_in_chunk, columns=col_names)
-                
-                if not chunk_df.empty and fp2_cols:
-                    for fp2_col_name in fp2_cols:
-                        if fp2_col_name in chunk_df.columns:
-                            # === POCZĄTEK POPRAWKI ===
-                            # Krok 1: Konwertuj na typ numeryczny, zamieniając błędy na NaN
-                            numeric_series = pd.to_numeric(chunk_df[fp2_col_name], errors='coerce')
-                            # Krok 2: Wypełnij ewentualne NaN zerem i rzutuj na typ integer
-                            integer_series = numeric_series.fillna(0).astype(int)
-                            # Krok 3: Dopiero teraz zastosuj funkcję dekodującą
-                            chunk_df[fp2_col_name] = integer_series.apply(decode_csi_fs2_float)
-                            # === KONIEC POPRAWKI ===
-                
-                if 'SECONDS' in chunk_df.columns and 'NANOSECONDS' in chunk_df.columns:
-                    secs = pd.to_numeric(chunk_df['SECONDS'], errors='coerce')
-                    nanos = pd.to_numeric(chunk_df['NANOSECONDS'], errors='coerce')
-                    chunk_df['TIMESTAMP'] = CAMPBELL_EPOCH + pd.to_timedelta(secs, unit='s') + pd.to_timedelta(nanos, unit='ns')
-                
-                all_chunks.append(chunk_df)
-
-                if len(records_in_chunk) < chunk_size_rows: break
-
-        if not all_chunks: return pd.DataFrame()
+            header_end = f.tell()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                n_records = (len(mm) - header_end) // record_size
+                if n_records == 0: return pd.DataFrame()
+                if hasattr(mm, 'madvise'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                arr = np.frombuffer(mm, dtype=record_dtype, count=n_records, offset=header_end)
+                try:
+                    columns = _tob1_columns(arr, col_names, fp2_cols)
+                except BaseException as exc:
+                    # Ramki w tracebacku trzymają widok na mmap; bez ich wyczyszczenia
+                    # zamknięcie mapowania rzuciłoby BufferError i zamaskowało właściwy błąd
+                    traceback.clear_frames(exc.__traceback__)
+                    raise
+                finally:
+                    # Widok na mmap musi zniknąć przed zamknięciem mapowania
+                    del arr
+        df = pd.DataFrame(columns, columns=col_names)
+
+        if 'SECONDS' in df.columns and 'NANOSECONDS' in df.columns:
+            secs, nanos = df['SECONDS'], df['NANOSECONDS']
+            if secs.dtype.kind in 'iu' and nanos.dtype.kind in 'iu':
+                # Całkowitoliczbowo: epoka, sekundy i nanosekundy w jednej sumie int64 [ns]
+                # (pola 32-bitowe mieszczą się w zakresie datetime64[ns]), widok bez kopii
+                total_ns = secs.to_numpy(np.int64) * 1_000_000_000
+                total_ns += nanos.to_numpy(np.int64)
+                total_ns += CAMPBELL_EPOCH_NS
+                df['TIMESTAMP'] = total_ns.view('datetime64[ns]')
+            else:
+                secs = pd.to_numeric(secs, errors='coerce')
+                nanos = pd.to_numeric(nanos, errors='coerce')
+                df['TIMESTAMP'] = CAMPBELL_EPOCH + pd.to_timedelta(secs, unit='s') + pd.to_timedelta(nanos, unit='ns')
 
-        non_empty_chunks = [df for df in all_chunks if not df.empty]
-        if not non_empty_chunks: return pd.DataFrame()
-        final_df = pd.concat(non_empty_chunks, ignore_index=True)
-        final_df['source_file'] = str(file_path.resolve())
-        return final_df
+        df['source_file'] = str(file_path.resolve())
+        return df
 
     except Exception as e:
         logging.error(f"Krytyczny błąd odczytu TOB1 z {file_path.name}: {e}", exc_info=True)
@@ -544,28 +845,102 @@ def get_toa5_metadata(file_path: Path) -> tuple[list[str], int] | None:
         logging.error(f"Błąd parsowania nagłówka TOA5 w {file_path.name}: {e}")
         return None
 
+# Końcowe przesunięcie strefy w tekstowym znaczniku czasu, np. ' +0100' lub '-01:00'
+_TZ_OFFSET_SUFFIX_PAT = r'^(.*?)\s?([+-]\d{2}):?(\d{2})$'
+
+def _parse_timestamp_strings(ts_str: pd.Series) -> pd.Series:
+    """
+    Szybsza ścieżka dla pd.to_datetime(ts_str, errors='coerce'). Najpierw jawny format
+    ISO8601 - bez zgadywania formatu z pierwszego wiersza, więc wiersze z ułamkami sekund
+    i bez nich (np. '00:00:00.5' i '00:00:01') są parsowane razem. Gdy wszystkie znaczniki
+    mają to samo przesunięcie strefy, część naiwna jest parsowana osobno i lokalizowana raz.
+    Każdy przypadek nietypowy wraca do pierwotnego wywołania.
+    """
+    if not (pd.api.types.is_object_dtype(ts_str) or pd.api.types.is_string_dtype(ts_str)):
+        return pd.to_datetime(ts_str, errors='coerce')
+    try:
+        valid = ts_str.dropna()
+        if not valid.empty and re.match(_TZ_OFFSET_SUFFIX_PAT, str(valid.iloc[0])):
+            parts = ts_str.str.extract(_TZ_OFFSET_SUFFIX_PAT)
+            offsets = (parts[1] + parts[2]).dropna().unique()
+            if len(offsets) == 1 and parts[0].notna().sum() == len(valid):
+                offset = offsets[0]
+                minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+                tz = timezone(timedelta(minutes=-minutes if offset[0] == '-' else minutes))
+                naive = pd.to_datetime(parts[0], format='ISO8601')
+                return naive.dt.tz_localize(tz)
+            return pd.to_datetime(ts_str, errors='coerce')
+        return pd.to_datetime(ts_str, format='ISO8601')
+    except (ValueError, TypeError, AttributeError):
+        return pd.to_datetime(ts_str, errors='coerce')
+
+def _match_c_engine_dtypes(df: pd.DataFrame, pinned_columns) -> Optional[pd.DataFrame]:
+    """
+    Sprowadza typy kolumn z parsera pyarrow do wyniku silnika C (poza kolumnami
+    o jawnie podanym dtype). Kolumna bez żadnej wartości (typ null w Arrow) staje się
+    float64 z NaN. Gdy pyarrow rozpoznał w kolumnie daty lub czasy, a silnik C zostawiłby
+    tekst, zwraca None - oryginalnego zapisu nie da się odtworzyć, więc plik czyta silnik C.
+    """
+    for col in df.columns:
+        if col in pinned_columns:
+            continue
+        values = df[col]
+        if values.dtype.kind in 'mM':
+            return None
+        if values.dtype == object:
+            inferred = pd.api.types.infer_dtype(values, skipna=True)
+            if inferred == 'empty':
+                df[col] = np.full(len(df), np.nan)
+            elif inferred in ('date', 'time', 'datetime'):
+                return None
+    return df
+
+def _read_csv_pyarrow(file_path: Path, **kwargs) -> Optional[pd.DataFrame]:
+    """
+    Odczyt całego pliku jednym przebiegiem wielowątkowego parsera pyarrow (gdy dostępny).
+    Zwraca None, gdy pyarrow brak albo plik go nie przejdzie - m.in. wiersz o innej liczbie
+    pól (on_bad_lines='error'), który silnik C obsługuje po swojemu, lub kolumna, której
+    typu nie da się sprowadzić do wyniku silnika C; wywołujący czyta wtedy plik
+    porcjami silnikiem C jak dotąd.
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+    try:
+        df = pd.read_csv(file_path, engine='pyarrow', on_bad_lines='error', **kwargs)
+    except Exception as e:
+        logging.debug("Odczyt pyarrow nieudany dla %s (%s) - silnik C.", file_path.name, e)
+        return None
+    df = _match_c_engine_dtypes(df, kwargs.get('dtype') or {})
+    if df is None:
+        logging.debug("Odczyt pyarrow dla %s rozpoznał daty w kolumnie tekstowej - silnik C.", file_path.name)
+    return df
+
 def read_toa5_data(file_path: Path, metadata: tuple) -> pd.DataFrame:
     """
     (Wersja 2.1) Wczytuje dane TOA5 w porcjach (chunks), aby oszczędzać pamięć
-    przy bardzo dużych plikach.
+    przy bardzo dużych plikach. Z pyarrow cały plik czytany jest naraz parserem Arrow.
     """
     col_names, num_header_lines = metadata
     all_chunks = []
     try:
-        # Użyj chunksize, aby wczytywać plik porcjami po 100 000 wierszy
-        chunk_iterator = pd.read_csv(
-            file_path, skiprows=num_header_lines, header=None, names=col_names,
+        read_kwargs = dict(
+            skiprows=num_header_lines, header=None, names=col_names,
             na_values=['"NAN"', 'NAN', '"INF"', '""', ''], quotechar='"',
-            encoding='latin-1', on_bad_lines='warn',
-            chunksize=100_000
-        )
+            encoding='latin-1')
+        # TIMESTAMP jako tekst - czyszczony i parsowany poniżej tak samo dla obu silników
+        whole_df = _read_csv_pyarrow(file_path, dtype={'TIMESTAMP': str}, **read_kwargs)
+        if whole_df is not None:
+            chunk_iterator = [whole_df]
+        else:
+            # Użyj chunksize, aby wczytywać plik porcjami po 100 000 wierszy
+            chunk_iterator = pd.read_csv(file_path, on_bad_lines='warn', chunksize=100_000, **read_kwargs)
 
         for chunk_df in chunk_iterator:
             if 'TIMESTAMP' in chunk_df.columns:
                 # Wykonaj czyszczenie dat dla każdej porcji
                 timestamps_str = chunk_df['TIMESTAMP'].astype(str)
                 cleaned_timestamps_str = timestamps_str.str.replace('.0-', '-', regex=False)
-                chunk_df['TIMESTAMP'] = pd.to_datetime(cleaned_timestamps_str, errors='coerce')
+                chunk_df['TIMESTAMP'] = _parse_timestamp_strings(cleaned_timestamps_str)
                 all_chunks.append(chunk_df)
         
         if not all_chunks:
@@ -590,16 +965,23 @@ def read_simple_csv_data(file_path: Path) -> pd.DataFrame:
         # Zdefiniuj listę wartości, które mają być traktowane jako NaN (brak danych)
         custom_nan_values = ["OverRange", "UnderRange", "NAN", "INF", "-INF", ""]
 
-        chunk_iterator = pd.read_csv(
-            file_path,
-            header=0,
-            low_memory=False, 
-            encoding='latin-1',
-            on_bad_lines='warn',
-            chunksize=100_000,
-            na_values=custom_nan_values, # <-- KLUCZOWA ZMIANA
-            usecols=lambda col_name: col_name not in COLUMNS_TO_EXCLUDE_FROM_CSV
-        )
+        whole_df = _read_csv_pyarrow(
+            file_path, header=0, encoding='latin-1', na_values=custom_nan_values,
+            usecols=lambda col_name: col_name not in COLUMNS_TO_EXCLUDE_FROM_CSV,
+            dtype={'Timestamp': str, 'TIMESTAMP': str})
+        if whole_df is not None:
+            chunk_iterator = [whole_df]
+        else:
+            chunk_iterator = pd.read_csv(
+                file_path,
+                header=0,
+                low_memory=False, 
+                encoding='latin-1',
+                on_bad_lines='warn',
+                chunksize=100_000,
+                na_values=custom_nan_values, # <-- KLUCZOWA ZMIANA
+                usecols=lambda col_name: col_name not in COLUMNS_TO_EXCLUDE_FROM_CSV
+            )
         
         for chunk_df in chunk_iterator:
             if 'Timestamp' not in chunk_df.columns and 'TIMESTAMP' not in chunk_df.columns:
@@ -608,7 +990,7 @@ def read_simple_csv_data(file_path: Path) -> pd.DataFrame:
             if 'Timestamp' in chunk_df.columns:
                 chunk_df.rename(columns={'Timestamp': 'TIMESTAMP'}, inplace=True)
 
-            chunk_df['TIMESTAMP'] = pd.to_datetime(chunk_df['TIMESTAMP'], errors='coerce')
+            chunk_df['TIMESTAMP'] = _parse_timestamp_strings(chunk_df['TIMESTAMP'])
             all_chunks.append(chunk_df)
 
         if not all_chunks:
@@ -699,6 +1081,18 @@ def find_matlab_years(config: dict) -> List[int]:
         logging.error(f"Krytyczny błąd podczas skanowania lat dla danych .MAT: {e}", exc_info=True)
         return []
         
+def fill_gaps_from_matlab(logger_df: pd.DataFrame, matlab_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Uzupełnia braki (NaN) danych z loggera wartościami z .MAT (obie ramki indeksowane TIMESTAMP).
+    Przy unikalnych indeksach wystarcza jedno combine_first; duplikaty znaczników czasu
+    wymagają grupowania (pierwsza niepusta wartość w kolejności: logger, potem .MAT).
+    """
+    columns = logger_df.columns.append(matlab_df.columns.difference(logger_df.columns, sort=False))
+    if logger_df.index.is_unique and matlab_df.index.is_unique:
+        return logger_df.combine_first(matlab_df).reindex(columns=columns)
+    combined_df = pd.concat([logger_df, matlab_df])
+    return combined_df.groupby(combined_df.index).first()
+
 def load_matlab_data(year: int, config: dict) -> pd.DataFrame:
     """
     (Wersja 3.2) Zawiera poprawki na warunek interwału (<= 5s) oraz
@@ -723,6 +1117,7 @@ def load_matlab_data(year: int, config: dict) -> pd.DataFrame:
 
     if not data_path.exists():
         return pd.DataFrame()
+    from scipy.io import loadmat  # pyright: ignore[reportMissingImports]
 
     interval = config.get('interval', '')
     # === POCZĄTEK POPRAWKI #1: Poprawny warunek interwału ===
@@ -803,6 +1198,76 @@ def load_matlab_data(year: int, config: dict) -> pd.DataFrame:
     final_df = clean_column_names(final_df)
     return final_df
     
+def _resolve_aliases(cfg: dict, value_type: type) -> dict:
+    """
+    Spłaszcza aliasy tekstowe (np. 'TU_PROF_1s': 'TU_TZSHIFT') do bezpośrednich
+    wartości konfiguracji-matki. Wpisy, które nie prowadzą do wartości typu
+    `value_type`, są pomijane (tak jak brak reguły).
+    """
+    resolved = {}
+    for key, value in cfg.items():
+        if isinstance(value, str):
+            value = cfg.get(value)
+        if isinstance(value, value_type) and value:
+            resolved[key] = value
+    return resolved
+
+def _compile_timezone_corrections(cfg: dict) -> Dict[str, dict]:
+    """TIMEZONE_CORRECTIONS bez aliasów, z 'correction_end_date' jako pd.Timestamp (jedna kopia na konfigurację-matkę)."""
+    compiled, parsed = {}, {}
+    for file_id, entry in _resolve_aliases(cfg, dict).items():
+        if id(entry) not in parsed:
+            parsed[id(entry)] = {**entry, 'correction_end_date': pd.to_datetime(entry['correction_end_date'])}
+        compiled[file_id] = parsed[id(entry)]
+    return compiled
+
+def _compile_manual_time_shifts(cfg: dict) -> Dict[str, list]:
+    """MANUAL_TIME_SHIFTS bez aliasów, z regułami jako (start, end, offset) już sparsowanymi."""
+    compiled, parsed = {}, {}
+    for file_id, rules in _resolve_aliases(cfg, list).items():
+        if id(rules) not in parsed:
+            parsed_rules = []
+            for rule in rules:
+                try:
+                    parsed_rules.append((pd.to_datetime(rule['start']), pd.to_datetime(rule['end']),
+                                         pd.Timedelta(hours=rule['offset_hours'])))
+                except Exception as e:
+                    logging.warning(f"Błąd reguły manualnej dla '{file_id}': {e}.")
+            parsed[id(rules)] = parsed_rules
+        compiled[file_id] = parsed[id(rules)]
+    return compiled
+
+def _vectorize_manual_time_shifts(compiled: Dict[str, list]) -> Dict[str, Optional[tuple]]:
+    """
+    Dla każdego file_id buduje posortowane tablice (starts, ends, offsets) w ns do
+    przypisania przesunięć przez np.searchsorted. Wersja wektorowa jest równoważna
+    sekwencyjnej pętli tylko, gdy przedziały są rozłączne i żaden przesunięty przedział
+    nie nachodzi na przedział stosowany później - w przeciwnym razie zapisujemy None.
+    """
+    vec, done = {}, {}
+    for file_id, rules in compiled.items():
+        if id(rules) not in done:
+            result = None
+            if rules:
+                disjoint = all(
+                    (end_i + off_i < start_k or start_i + off_i > end_k) and (end_i < start_k or start_i > end_k)
+                    for i, (start_i, end_i, off_i) in enumerate(rules)
+                    for start_k, end_k, _ in rules[i + 1:]
+                )
+                if disjoint:
+                    order = sorted(rules, key=lambda r: r[0])
+                    result = (np.array([r[0].value for r in order], dtype='datetime64[ns]'),
+                              np.array([r[1].value for r in order], dtype='datetime64[ns]'),
+                              np.array([r[2].value for r in order], dtype='timedelta64[ns]'))
+            done[id(rules)] = result
+        vec[file_id] = done[id(rules)]
+    return vec
+
+# Konfiguracje rozwiązane raz przy imporcie - w gorącej ścieżce jedno wyszukiwanie w słowniku
+_TZ_CFG = _compile_timezone_corrections(TIMEZONE_CORRECTIONS)
+_MTS_CFG = _compile_manual_time_shifts(MANUAL_TIME_SHIFTS)
+_MTS_VEC = _vectorize_manual_time_shifts(_MTS_CFG)
+
 def apply_timezone_correction(ts_series_naive: pd.Series, file_id: str) -> pd.Series:
     """
     Stosuje korekty stref czasowych i zawsze zwraca serię w formacie "naiwnym".
@@ -811,12 +1276,7 @@ def apply_timezone_correction(ts_series_naive: pd.Series, file_id: str) -> pd.Se
     if ts_series_naive.empty:
         return ts_series_naive
     
-    config_entry = TIMEZONE_CORRECTIONS.get(file_id)
-    final_config = None
-    if isinstance(config_entry, str):
-        final_config = TIMEZONE_CORRECTIONS.get(config_entry)
-    elif isinstance(config_entry, dict):
-        final_config = config_entry
+    final_config = _TZ_CFG.get(file_id)
 
     if not final_config:
         # --- POCZĄTEK POPRAWKI ---
@@ -827,46 +1287,49 @@ def apply_timezone_correction(ts_series_naive: pd.Series, file_id: str) -> pd.Se
     source_tz = final_config['source_tz']
     post_correction_tz = final_config['post_correction_tz']
     target_tz = final_config['target_tz']
-    correction_end_date = pd.to_datetime(final_config['correction_end_date'])
+    correction_end_date = final_config['correction_end_date']
 
-    pre_mask = ts_series_naive <= correction_end_date
+    ts_naive = ts_series_naive if pd.api.types.is_datetime64_dtype(ts_series_naive) else pd.to_datetime(ts_series_naive)
+    pre_mask = (ts_naive <= correction_end_date).to_numpy()
     post_mask = ~pre_mask
 
-    pre_series = ts_series_naive[pre_mask].dt.tz_localize(source_tz, ambiguous='NaT', nonexistent='NaT')
-    post_series = ts_series_naive[post_mask].dt.tz_localize(post_correction_tz, ambiguous='NaT', nonexistent='NaT')
-
-    series_to_concat = [s for s in [pre_series, post_series] if not s.empty]
-    
-    if not series_to_concat:
-        return pd.Series(dtype='datetime64[ns]')
-
-    combined_series = pd.to_datetime(pd.concat(series_to_concat).sort_index(), errors='coerce', utc=True)
-
-    if combined_series.empty:
-        return combined_series
+    # Każda część lokalizowana i konwertowana do strefy docelowej w całości, a wynik
+    # wpisywany maską w miejsce źródłowych wierszy - bez łączenia serii o różnych
+    # strefach (typ object) i ponownego parsowania przez pd.to_datetime
+    result = np.full(len(ts_naive), np.datetime64('NaT'), dtype=ts_naive.dtype)
+    for mask, tz in ((pre_mask, source_tz), (post_mask, post_correction_tz)):
+        if mask.any():
+            part = ts_naive[mask].dt.tz_localize(tz, ambiguous='NaT', nonexistent='NaT')
+            result[mask] = part.dt.tz_convert(target_tz).dt.tz_localize(None).to_numpy()
 
     # Zawsze zwracaj dane bez strefy czasowej (naiwne)
-    return combined_series.dt.tz_convert(target_tz).dt.tz_localize(None)
+    return pd.Series(result, index=ts_naive.index, name=ts_naive.name)
 
 def apply_manual_time_shifts(df: pd.DataFrame, file_id: str) -> pd.DataFrame:
     """(Wersja 2.0) Poprawiona, aby działać na naiwnych znacznikach czasu."""
-    config_entry = MANUAL_TIME_SHIFTS.get(file_id)
-    rules = None
-    if isinstance(config_entry, str):
-        rules = MANUAL_TIME_SHIFTS.get(config_entry)
-    elif isinstance(config_entry, list):
-        rules = config_entry
+    rules = _MTS_CFG.get(file_id)
 
     if not rules or df.empty:
         return df
     
     df_out = df.copy()
-    for rule in rules:
+    bounds = _MTS_VEC.get(file_id)
+    ts_values = df_out['TIMESTAMP'].to_numpy()
+    if bounds is not None and ts_values.dtype.kind == 'M':
+        # Jedno searchsorted zamiast maski per przedział: ostatni start <= t, potem t <= koniec
+        unit = np.datetime_data(ts_values.dtype)[0]
+        starts, ends, offsets = (a.astype(f'{a.dtype.kind}8[{unit}]') for a in bounds)
+        idx = np.searchsorted(starts, ts_values, side='right') - 1
+        safe_idx = np.maximum(idx, 0)
+        mask = (idx >= 0) & (ts_values <= ends[safe_idx])
+        if mask.any():
+            shifted = ts_values.copy()
+            shifted[mask] += offsets[safe_idx[mask]]
+            df_out['TIMESTAMP'] = shifted
+        return df_out
+
+    for start_ts, end_ts, offset in rules:
         try:
-            # Tworzymy naiwne daty do porównania
-            start_ts = pd.to_datetime(rule['start'])
-            end_ts = pd.to_datetime(rule['end'])
-            offset = pd.Timedelta(hours=rule['offset_hours'])
             mask = (df_out['TIMESTAMP'] >= start_ts) & (df_out['TIMESTAMP'] <= end_ts)
             if mask.any():
                 df_out.loc[mask, 'TIMESTAMP'] += offset
@@ -878,17 +1341,252 @@ def apply_manual_time_shifts(df: pd.DataFrame, file_id: str) -> pd.DataFrame:
 
 # W unified_script.py - ZASTĄP CAŁĄ TĘ FUNKCJĘ
 
+# Skompilowane reguły kalibracyjne per zestaw (budowane leniwie).
+# Klucz: nazwa zestawu; wartość: (id słownika reguł, (granice przedziałów, tablice początków i końców, {kolumna: (krotka CalibrationRule, tablice wektorowe lub None)})).
+_CALIBRATION_CACHE: Dict[str, tuple] = {}
+
+@dataclass(frozen=True, slots=True)
+class CalibrationRule:
+    """Skompilowana reguła kalibracji (indeks wspólnego przedziału zamiast pary dat)."""
+    interval_id: int
+    rule_type: str
+    multiplier: float = np.nan
+    addend: float = np.nan
+    expression: Optional[str] = None
+    constants: dict = field(default_factory=dict)
+
+@dataclass(frozen=True, slots=True)
+class _IntervalParseError:
+    """
+    Zapamiętany błąd parsowania granic przedziału: typ i argumenty wyjątku.
+    Sama instancja wyjątku w pamięci podręcznej rosłaby o ramki tracebacku
+    przy każdym ponownym zgłoszeniu, więc za każdym razem tworzona jest nowa.
+    """
+    exc_type: type
+    args: tuple
+
+    def exception(self) -> Exception:
+        try:
+            return self.exc_type(*self.args)
+        except Exception:
+            return ValueError(*self.args)
+
+@functools.lru_cache(maxsize=None)
+def _parse_rule_interval(start, end):
+    """
+    Granice przedziału reguły jako datetime64[ns], parsowane raz przy kompilacji.
+    Błąd parsowania jest zwracany jako _IntervalParseError (nie zgłaszany),
+    aby zgłosić go przy stosowaniu reguły.
+    """
+    try:
+        return (np.datetime64(pd.to_datetime(start).as_unit('ns')),
+                np.datetime64(pd.to_datetime(end).as_unit('ns')))
+    except Exception as e:
+        return _IntervalParseError(type(e), e.args)
+
+def _vectorize_calibration_column(rules_list: list, mb: np.ndarray) -> Optional[tuple]:
+    """
+    (początki, końce, mnożniki, składniki) posortowane po początku przedziału, dla kolumny
+    z samymi regułami 'simple' o rozłącznych przedziałach; w przeciwnym razie None.
+    """
+    if not rules_list or np.isnan(mb).any():
+        return None
+    try:
+        starts = pd.to_datetime([rule.get('start') for rule in rules_list]).as_unit('ns')
+        ends = pd.to_datetime([rule.get('end') for rule in rules_list]).as_unit('ns')
+    except (ValueError, TypeError):
+        return None
+    if starts.hasnans or ends.hasnans or (starts > ends).any():
+        return None
+    order = np.argsort(starts.asi8, kind='stable')
+    starts, ends = starts.to_numpy()[order], ends.to_numpy()[order]
+    if (starts[1:] <= ends[:-1]).any():
+        # Nakładające się reguły działają kumulatywnie - zostaje pętla sekwencyjna
+        return None
+    return starts, ends, mb[order, 0].copy(), mb[order, 1].copy()
+
+def _compile_calibration_rules(station_name: str, column_rules: dict) -> tuple:
+    """
+    Zamienia słowniki reguł każdej kolumny na krotkę CalibrationRule (kolejność
+    zachowana). Dla reguł innych typów niż 'simple' mnożnik i składnik to NaN.
+
+    Przedziały (start, end) powtarzające się między zmiennymi (np. G_1_1_1..G_1_4_1
+    w TL1_CAL) trafiają do jednej wspólnej listy, a każda reguła przechowuje
+    jedynie indeks przedziału - maska czasowa liczona jest raz dla całego bloku.
+
+    Powtarzające się reguły i całe listy reguł są kompilowane raz i współdzielone
+    przez referencję między kolumnami.
+
+    Kolumny, których wszystkie reguły są typu 'simple', a przedziały rozłączne,
+    dostają dodatkowo posortowane tablice przedziałów z wektorami mnożników
+    i składników - każdy wiersz trafia wtedy do swojej reguły jednym searchsorted.
+    """
+    cached = _CALIBRATION_CACHE.get(station_name)
+    if cached is not None and cached[0] == id(column_rules):
+        return cached[1]
+
+    interval_ids: Dict[tuple, int] = {}
+    # Identyczne reguły i całe listy reguł (np. G_n_1_1 w MEZYK_DOWN_CAL) współdzielą jeden obiekt
+    rule_pool: Dict[tuple, CalibrationRule] = {}
+    list_pool: Dict[tuple, tuple] = {}
+    columns = {}
+    for col_name, rules_list in column_rules.items():
+        if col_name.startswith('_'):
+            continue
+        mb = np.full((len(rules_list), 2), np.nan, dtype=np.float64)
+        compiled_rules = []
+        for k, rule in enumerate(rules_list):
+            interval_id = interval_ids.setdefault((rule.get('start'), rule.get('end')), len(interval_ids))
+            rule_type = rule.get('type', 'simple')
+            if rule_type == 'simple':
+                mb[k, 0] = float(rule.get('multiplier', 1.0))
+                mb[k, 1] = float(rule.get('addend', 0.0))
+            if rule_type == 'simple' and mb[k, 0] == 1.0 and mb[k, 1] == 0.0:
+                continue  # Reguła tożsamościowa (x * 1 + 0) - nic do zrobienia
+            constants = rule.get('constants', {})
+            key = (interval_id, rule_type, repr(mb[k].tolist()), rule.get('expression'), repr(constants))
+            compiled_rule = rule_pool.get(key)
+            if compiled_rule is None:
+                compiled_rule = rule_pool[key] = CalibrationRule(
+                    interval_id=interval_id, rule_type=rule_type,
+                    multiplier=mb[k, 0], addend=mb[k, 1],
+                    expression=rule.get('expression'), constants=constants,
+                )
+            compiled_rules.append(compiled_rule)
+        list_key = tuple(map(id, compiled_rules))
+        if list_key not in list_pool:
+            list_pool[list_key] = (tuple(compiled_rules), _vectorize_calibration_column(rules_list, mb))
+        columns[col_name] = list_pool[list_key]
+    bounds = [_parse_rule_interval(start, end) for start, end in interval_ids]
+    # Układ SoA: granice wszystkich przedziałów w dwóch tablicach (NaT dla błędnych)
+    nat = np.datetime64('NaT', 'ns')
+    starts = np.array([nat if isinstance(b, _IntervalParseError) else b[0] for b in bounds], dtype='datetime64[ns]')
+    ends = np.array([nat if isinstance(b, _IntervalParseError) else b[1] for b in bounds], dtype='datetime64[ns]')
+    compiled = (bounds, starts, ends, columns)
+    _CALIBRATION_CACHE[station_name] = (id(column_rules), compiled)
+    return compiled
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, nogil=True)
+    def _calibration_segments_kernel(values, lo, hi, mult, add):
+        """Sekwencyjne (kumulatywne) mnożenie i dodawanie na wycinkach [lo[k], hi[k])."""
+        for k in range(lo.shape[0]):
+            m = mult[k]
+            a = add[k]
+            if m == 1.0:
+                for j in range(lo[k], hi[k]):
+                    values[j] = values[j] + a
+            elif a == 0.0:
+                for j in range(lo[k], hi[k]):
+                    values[j] = values[j] * m
+            else:
+                for j in range(lo[k], hi[k]):
+                    values[j] = values[j] * m + a
+
+# Minimalna liczba komórek (wiersze x kolumny wektorowe), od której kalibracja kolumn idzie do wątków
+_CALIBRATION_THREAD_MIN_CELLS = 2_000_000
+
+def _calibrate_column_vectorized(column: pd.Series, vectorized: tuple, timestamps: np.ndarray,
+                                 rule_lookups: Dict[tuple, tuple]) -> Optional[np.ndarray]:
+    """
+    Nowe wartości kolumny z rozłącznymi regułami 'simple' (None, gdy żaden wiersz nie
+    trafia w regułę). rule_lookups współdzieli przypisanie wierszy do reguł między
+    kolumnami o tych samych przedziałach.
+    """
+    starts, ends, multipliers, addends = vectorized
+    key = (starts.tobytes(), ends.tobytes())
+    lookup = rule_lookups.get(key)
+    if lookup is None:
+        if timestamps.dtype.kind != 'M':
+            raise TypeError(f"TIMESTAMP typu {timestamps.dtype}")
+        # Ostatni przedział o początku <= t; trafienie, gdy t <= jego koniec (NaT nigdy)
+        all_idx = np.searchsorted(starts, timestamps, side='right') - 1
+        hit = all_idx >= 0
+        hit[hit] = timestamps[hit] <= ends[all_idx[hit]]
+        lookup = rule_lookups[key] = (hit, all_idx[hit])
+    hit, rule_idx = lookup
+    if not hit.any():
+        return None
+    values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=np.float64, copy=True)
+    if (multipliers == 1.0).all():
+        values[hit] += addends[rule_idx]
+    elif (addends == 0.0).all():
+        values[hit] *= multipliers[rule_idx]
+    else:
+        values[hit] = values[hit] * multipliers[rule_idx] + addends[rule_idx]
+    return values
+
+def _scale_offset(values: np.ndarray, rows, multiplier: float, addend: float) -> None:
+    """values[rows] = values[rows] * multiplier + addend w miejscu; sam dodatek lub sam mnożnik, gdy drugi jest neutralny."""
+    if multiplier == 1.0:
+        values[rows] += addend
+    elif addend == 0.0:
+        values[rows] *= multiplier
+    else:
+        values[rows] = values[rows] * multiplier + addend
+
+def _apply_calibration_segments(values: np.ndarray, segments: List[tuple]) -> None:
+    """Stosuje zebrane wycinki reguł 'simple' do tablicy (w miejscu) i czyści listę."""
+    if not segments:
+        return
+    if NUMBA_AVAILABLE:
+        lo, hi, mult, add = zip(*segments)
+        _calibration_segments_kernel(values, np.array(lo, dtype=np.int64), np.array(hi, dtype=np.int64),
+                                     np.array(mult, dtype=np.float64), np.array(add, dtype=np.float64))
+    else:
+        for i0, i1, multiplier, addend in segments:
+            _scale_offset(values, slice(i0, i1), multiplier, addend)
+    segments.clear()
+
+# Tablica dyspozycji grupa plików -> (nazwa zestawu, słownik reguł, reguły skompilowane) lub None.
+# Jedno wyszukiwanie na plik zamiast mapowania, słownika reguł i cache kompilacji; czyszczona,
+# gdy zmieni się mapowanie lub słownik zestawów.
+_CALIBRATION_DISPATCH: Dict[str, Optional[tuple]] = {}
+_CALIBRATION_DISPATCH_SOURCE: Optional[tuple] = None
+
+def _calibration_dispatch(file_id: str) -> Optional[tuple]:
+    """Zwraca (nazwa zestawu, reguły, skompilowane reguły) dla grupy lub None, gdy brak kalibracji."""
+    global _CALIBRATION_DISPATCH_SOURCE
+    source = (id(STATION_MAPPING_FOR_CALIBRATION), id(CALIBRATION_RULES_BY_STATION))
+    if _CALIBRATION_DISPATCH_SOURCE != source:
+        _CALIBRATION_DISPATCH.clear()
+        _CALIBRATION_DISPATCH_SOURCE = source
+    try:
+        return _CALIBRATION_DISPATCH[file_id]
+    except KeyError:
+        pass
+    station_name = STATION_MAPPING_FOR_CALIBRATION.get(file_id)
+    entry = None
+    if station_name and station_name in CALIBRATION_RULES_BY_STATION:
+        column_rules = CALIBRATION_RULES_BY_STATION[station_name]
+        entry = (station_name, column_rules, _compile_calibration_rules(station_name, column_rules))
+    _CALIBRATION_DISPATCH[sys.intern(file_id)] = entry
+    return entry
+
+def _rule_time_mask(ts: pd.Series, timestamps: np.ndarray, start, end) -> np.ndarray:
+    """Maska start <= TIMESTAMP <= end jako tablica bool; dla datetime64 porównania w NumPy."""
+    bounds = _parse_rule_interval(start, end)
+    if isinstance(bounds, _IntervalParseError):
+        raise bounds.exception()
+    if timestamps.dtype.kind == 'M':
+        return (timestamps >= bounds[0]) & (timestamps <= bounds[1])
+    return ((ts >= pd.Timestamp(bounds[0])) & (ts <= pd.Timestamp(bounds[1]))).to_numpy()
+
 def apply_calibration(df: pd.DataFrame, file_id: str) -> pd.DataFrame:
     """
     (Wersja Ostateczna) Stosuje reguły kalibracyjne z gwarancją, że dane
     spoza zdefiniowanego okresu pozostają nietknięte.
     """
-    station_name = STATION_MAPPING_FOR_CALIBRATION.get(file_id)
-    if not station_name or station_name not in CALIBRATION_RULES_BY_STATION:
+    dispatch = _calibration_dispatch(file_id)
+    if dispatch is None:
         return df
 
-    column_rules = CALIBRATION_RULES_BY_STATION[station_name]
+    station_name, column_rules, compiled = dispatch
     df_calibrated = df.copy()
+    timestamps = df_calibrated['TIMESTAMP'].to_numpy()
+    if timestamps.dtype.kind == 'M':
+        # Porównania z granicami w ns bez ponownego parsowania dat reguł
+        timestamps = timestamps.astype('datetime64[ns]', copy=False)
 
     # Przetwarzanie specjalnych reguł (np. _SWAP_RADIATION)
     for col_name, rules_list in column_rules.items():
@@ -898,9 +1596,7 @@ def apply_calibration(df: pd.DataFrame, file_id: str) -> pd.DataFrame:
         for rule in rules_list:
             if rule.get('type') == 'formula_swap':
                 try:
-                    start_ts = pd.to_datetime(rule['start'])
-                    end_ts = pd.to_datetime(rule['end'])
-                    mask = (df_calibrated['TIMESTAMP'] >= start_ts) & (df_calibrated['TIMESTAMP'] <= end_ts)
+                    mask = _rule_time_mask(df_calibrated['TIMESTAMP'], timestamps, rule['start'], rule['end'])
                     
                     if not mask.any():
                         continue
@@ -937,68 +1633,474 @@ def apply_calibration(df: pd.DataFrame, file_id: str) -> pd.DataFrame:
                 except Exception as e:
                     logging.warning(f"Błąd reguły zamiany kanałów '{col_name}': {e}", exc_info=True)
 
-    # Przetwarzanie standardowych reguł kalibracyjnych (bez zmian, ta część działała poprawnie)
-    for col_name, rules_list in column_rules.items():
-        if col_name.startswith('_'):
-            continue
-
+    # Przetwarzanie standardowych reguł kalibracyjnych
+    intervals, interval_starts, interval_ends, compiled_columns = compiled
+    interval_masks: Dict[int, Union[np.ndarray, slice]] = {}
+    rule_lookups: Dict[tuple, tuple] = {}
+    # Posortowane znaczniki: przedział reguły to wycinek z dwóch wyszukiwań binarnych
+    ts_sorted = _is_sorted_datetime(timestamps)
+    if ts_sorted:
+        # Wycinki wszystkich przedziałów stacji jednym wywołaniem na każdą granicę
+        slice_lo = np.searchsorted(timestamps, interval_starts, side='left')
+        slice_hi = np.maximum(np.searchsorted(timestamps, interval_ends, side='right'), slice_lo)
+    elif timestamps.dtype.kind == 'M' and len(interval_starts):
+        # Nieposortowane: przedziały rozłączne z zakresem czasu pliku nie budują masek
+        valid = timestamps[~np.isnat(timestamps)]
+        if len(valid):
+            in_window = (interval_ends >= valid.min()) & (interval_starts <= valid.max())
+        else:
+            in_window = np.zeros(len(interval_starts), dtype=bool)
+    # Kolumny z wektorową ścieżką są niezależne (czytają tylko własną kolumnę), więc dla
+    # dużych ramek liczone są równolegle w wątkach (NumPy zwalnia GIL); wyniki są
+    # przypisywane w pętli poniżej w oryginalnej kolejności kolumn.
+    vector_results: Dict[str, Future] = {}
+    vector_cols = [(col_name, vectorized) for col_name, (_, vectorized) in compiled_columns.items()
+                   if vectorized is not None and col_name in df_calibrated.columns]
+    if len(vector_cols) > 1 and len(df_calibrated) * len(vector_cols) >= _CALIBRATION_THREAD_MIN_CELLS:
+        with ThreadPoolExecutor(max_workers=min(len(vector_cols), os.cpu_count() or 1)) as executor:
+            vector_results = {
+                col_name: executor.submit(_calibrate_column_vectorized, df_calibrated[col_name], vectorized, timestamps, rule_lookups)
+                for col_name, vectorized in vector_cols
+            }
+    for col_name, (rules_list, vectorized) in compiled_columns.items():
         if col_name not in df_calibrated.columns:
             continue
 
+        if vectorized is not None:
+            try:
+                future = vector_results.get(col_name)
+                if future is not None:
+                    values = future.result()
+                else:
+                    values = _calibrate_column_vectorized(df_calibrated[col_name], vectorized, timestamps, rule_lookups)
+                if values is not None:
+                    df_calibrated[col_name] = values
+                continue
+            except Exception as e:
+                logging.debug(f"Wektorowa kalibracja '{col_name}' niedostępna ({e}) - pętla po regułach.")
+
+        # Kolejne reguły 'simple' działają na jednej tablicy; zapis do ramki przed 'formula' i na końcu.
+        # Wycinki (i0, i1, mnożnik, składnik) są zbierane i stosowane razem w tej samej kolejności.
+        values = None
+        segments: List[tuple] = []
         for rule in rules_list:
             try:
-                start_ts = pd.to_datetime(rule['start'])
-                end_ts = pd.to_datetime(rule['end'])
-                mask = (df_calibrated['TIMESTAMP'] >= start_ts) & (df_calibrated['TIMESTAMP'] <= end_ts)
+                mask = interval_masks.get(rule.interval_id)
+                if mask is None:
+                    bounds = intervals[rule.interval_id]
+                    if isinstance(bounds, _IntervalParseError):
+                        raise bounds.exception()
+                    start_ts, end_ts = bounds
+                    if ts_sorted:
+                        mask = slice(slice_lo[rule.interval_id], slice_hi[rule.interval_id])
+                    elif timestamps.dtype.kind == 'M':
+                        if in_window[rule.interval_id]:
+                            mask = (timestamps >= start_ts) & (timestamps <= end_ts)
+                        else:
+                            mask = slice(0, 0)
+                    else:
+                        mask = ((df_calibrated['TIMESTAMP'] >= pd.Timestamp(start_ts)) & (df_calibrated['TIMESTAMP'] <= pd.Timestamp(end_ts))).to_numpy()
+                    interval_masks[rule.interval_id] = mask
                 
-                if not mask.any():
+                if isinstance(mask, slice) and mask.stop == mask.start:
+                    continue
+                if not isinstance(mask, slice) and not mask.any():
                     continue
 
-                rule_type = rule.get('type', 'simple')
+                rule_type = rule.rule_type
 
                 if rule_type == 'simple':
-                    df_calibrated[col_name] = pd.to_numeric(df_calibrated[col_name], errors='coerce')
-                    multiplier = float(rule.get('multiplier', 1.0))
-                    addend = float(rule.get('addend', 0.0))
-                    df_calibrated.loc[mask, col_name] = (df_calibrated.loc[mask, col_name] * multiplier) + addend
+                    if values is None:
+                        values = pd.to_numeric(df_calibrated[col_name], errors='coerce').to_numpy(dtype=np.float64, copy=True)
+                    if isinstance(mask, slice):
+                        segments.append((mask.start, mask.stop, rule.multiplier, rule.addend))
+                    else:
+                        _scale_offset(values, mask, rule.multiplier, rule.addend)
                 
                 elif rule_type == 'formula':
-                    expression = rule.get('expression')
+                    expression = rule.expression
                     if not expression:
                         continue
+                    if values is not None:
+                        _apply_calibration_segments(values, segments)
+                        df_calibrated[col_name] = values
+                        values = None
                     
-                    constants = rule.get('constants', {})
-                    df_calibrated.loc[mask, col_name] = df_calibrated[mask].eval(
-                        expression,
-                        local_dict=constants
-                    )
+                    constants = rule.constants
+                    rows = df_calibrated.iloc[mask] if isinstance(mask, slice) else df_calibrated[mask]
+                    result = rows.eval(expression, local_dict=constants)
+                    target = df_calibrated[col_name]
+                    if target.dtype == np.float64 and getattr(result, 'dtype', None) == np.float64:
+                        # Zapis pozycyjny do kopii tablicy kolumny - bez wyrównywania etykiet .loc
+                        out = target.to_numpy(copy=True)
+                        out[mask] = result.to_numpy()
+                        df_calibrated[col_name] = out
+                    else:
+                        if isinstance(mask, slice):
+                            row_mask = np.zeros(len(df_calibrated), dtype=bool)
+                            row_mask[mask] = True
+                            mask = row_mask
+                        df_calibrated.loc[mask, col_name] = result
             except Exception as e:
                 logging.warning(f"Błąd standardowej reguły kalibracji dla '{col_name}': {e}")
+        if values is not None:
+            _apply_calibration_segments(values, segments)
+            df_calibrated[col_name] = values
 
     return df_calibrated
 
+# Tablice zakresów zbudowane z VALUE_RANGE_FLAGS (budowane leniwie, układ SoA):
+# równoległe listy prefiksów, wartości min i max oraz trie prefiksów, którego
+# węzły końcowe przechowują indeks reguły w tych tablicach.
+_RANGE_SOURCE_ID = None
+_RANGE_PREFIXES: List[str] = []
+_RANGE_MINS = np.empty(0, dtype=np.float64)
+_RANGE_MAXS = np.empty(0, dtype=np.float64)
+_RANGE_TRIE: dict = {}
+_RANGE_TERMINAL = '_range'
+
+def _build_range_tables(range_flags: dict):
+    """Buduje równoległe tablice prefiks/min/max oraz trie znak -> węzeł z indeksem reguły."""
+    global _RANGE_SOURCE_ID, _RANGE_PREFIXES, _RANGE_MINS, _RANGE_MAXS, _RANGE_TRIE
+    prefixes = list(range_flags)
+    mins = np.array([range_flags[p].get('min', -np.inf) for p in prefixes], dtype=np.float64)
+    maxs = np.array([range_flags[p].get('max', np.inf) for p in prefixes], dtype=np.float64)
+    root: dict = {}
+    for idx, prefix in enumerate(prefixes):
+        node = root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[_RANGE_TERMINAL] = idx
+    _RANGE_PREFIXES, _RANGE_MINS, _RANGE_MAXS, _RANGE_TRIE = prefixes, mins, maxs, root
+    _RANGE_SOURCE_ID = id(range_flags)
+    _RANGE_COLUMN_CACHE.clear()
+
+# Wynik dopasowania per nazwa kolumny: (min, max) najwęższego zakresu lub None (brak reguły).
+# Nazwy kolumn powtarzają się między plikami i latami, więc trie jest przechodzone raz na nazwę.
+_RANGE_COLUMN_CACHE: Dict[str, Optional[tuple]] = {}
+_RANGE_COLUMN_CACHE_MAX = 4096
+
+def _range_for_column(col_name: str) -> Optional[tuple]:
+    """(min, max) dla kolumny - max z minimów i min z maksimów wszystkich pasujących prefiksów."""
+    if _RANGE_SOURCE_ID != id(VALUE_RANGE_FLAGS):
+        _build_range_tables(VALUE_RANGE_FLAGS)
+    try:
+        return _RANGE_COLUMN_CACHE[col_name]
+    except KeyError:
+        pass
+    range_idx = _match_range_indices(col_name)
+    result = (_RANGE_MINS[range_idx].max(), _RANGE_MAXS[range_idx].min()) if range_idx else None
+    if len(_RANGE_COLUMN_CACHE) >= _RANGE_COLUMN_CACHE_MAX:
+        _RANGE_COLUMN_CACHE.clear()
+    _RANGE_COLUMN_CACHE[col_name] = result
+    return result
+
+def _match_range_indices(col_name: str) -> List[int]:
+    """
+    Zwraca indeksy wszystkich reguł VALUE_RANGE_FLAGS, których prefiks pasuje
+    do nazwy kolumny (od najkrótszego), w jednym przejściu po znakach nazwy.
+    """
+    if _RANGE_SOURCE_ID != id(VALUE_RANGE_FLAGS):
+        _build_range_tables(VALUE_RANGE_FLAGS)
+
+    matches = []
+    node = _RANGE_TRIE
+    if _RANGE_TERMINAL in node:
+        matches.append(node[_RANGE_TERMINAL])
+    for char in col_name:
+        node = node.get(char)
+        if node is None:
+            break
+        if _RANGE_TERMINAL in node:
+            matches.append(node[_RANGE_TERMINAL])
+    return matches
+
+# Minimalna liczba komórek (wiersze x kolumny), od której opłaca się wywołać jądro Numba
+_NUMBA_RANGE_THRESHOLD = 1_000_000
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _range_flags_kernel(data, mins, maxs, existing, out, hit):
+        """Porównanie z zakresem + scalenie z istniejącą flagą + zapis, równolegle po kolumnach."""
+        for j in prange(data.shape[1]):
+            lo = mins[j]
+            hi = maxs[j]
+            any_hit = False
+            for i in range(data.shape[0]):
+                v = data[i, j]
+                e = existing[i, j]
+                if v < lo or v > hi:
+                    any_hit = True
+                    out[i, j] = e if e != 0 else 4
+                else:
+                    out[i, j] = e
+            hit[j] = any_hit
+
+def _narrow_flags(flags: np.ndarray) -> np.ndarray:
+    """
+    Kolumna flag jako int8 - ten sam typ co flagi 0/99 z _ensure_flag_columns_exist.
+    Wartości spoza zakresu int8 (nieoczekiwane) zostawiają typ wejściowy.
+    """
+    if flags.dtype == np.int8:
+        return flags
+    if len(flags) == 0 or (flags.min() >= -128 and flags.max() <= 127):
+        return flags.astype(np.int8)
+    return flags
+
+def _apply_value_range_flags_numba(df_out: pd.DataFrame, targets: list) -> pd.DataFrame:
+    """Wariant apply_value_range_flags dla dużych ramek: wszystkie kolumny w jednym wywołaniu jądra Numba."""
+    n_rows, n_cols = len(df_out), len(targets)
+    data = np.empty((n_rows, n_cols), dtype=np.float64, order='F')
+    existing = np.zeros((n_rows, n_cols), dtype=np.int64, order='F')
+    for j, (col_name, _, _) in enumerate(targets):
+        data[:, j] = pd.to_numeric(df_out[col_name], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        flag_col_name = f"{col_name}_flag"
+        if flag_col_name in df_out.columns:
+            existing[:, j] = pd.to_numeric(df_out[flag_col_name], errors='coerce').fillna(0).astype(int).to_numpy()
+    mins = np.array([t[1] for t in targets], dtype=np.float64)
+    maxs = np.array([t[2] for t in targets], dtype=np.float64)
+    out = np.empty_like(existing)
+    hit = np.zeros(n_cols, dtype=np.bool_)
+    _range_flags_kernel(data, mins, maxs, existing, out, hit)
+    new_flags = []
+    for j, (col_name, _, _) in enumerate(targets):
+        if not hit[j]:
+            continue
+        flag_col_name = f"{col_name}_flag"
+        if flag_col_name in df_out.columns:
+            df_out[flag_col_name] = _narrow_flags(out[:, j])
+        else:
+            new_flags.append((col_name, data[:, j], _narrow_flags(out[:, j])))
+    _insert_range_flag_columns(df_out, new_flags)
+    return df_out
+
+def _first_flagging_range(col_name: str, values: np.ndarray) -> int:
+    """Indeks pierwszej (w kolejności VALUE_RANGE_FLAGS) reguły pasującej do kolumny, która flaguje jakąś wartość."""
+    for idx in sorted(_match_range_indices(col_name)):
+        if ((values < _RANGE_MINS[idx]) | (values > _RANGE_MAXS[idx])).any():
+            return idx
+    return len(_RANGE_PREFIXES)
+
+def _insert_range_flag_columns(df_out: pd.DataFrame, new_flags: list) -> None:
+    """
+    Dodaje nowe kolumny flag [(kolumna, wartości, flagi)] w kolejności jak przy pętli
+    po prefiksach VALUE_RANGE_FLAGS: według pierwszej flagującej reguły, a w jej obrębie
+    według kolejności kolumn danych (sortowanie stabilne).
+    """
+    new_flags.sort(key=lambda item: _first_flagging_range(str(item[0]), item[1]))
+    for col_name, _, flags in new_flags:
+        df_out[f"{col_name}_flag"] = flags
+
 def apply_value_range_flags(df: pd.DataFrame) -> pd.DataFrame:
     # apply quality flags for values outside of defined ranges
     if df.empty or not VALUE_RANGE_FLAGS: return df
     df_out = df.copy()
-    for prefix, range_dict in VALUE_RANGE_FLAGS.items():
-        target_cols = [col for col in df_out.columns if str(col).startswith(prefix)]
-        for col_name in target_cols:
-            numeric_col = pd.to_numeric(df_out[col_name], errors='coerce')
-            min_val, max_val = range_dict.get('min', -float('inf')), range_dict.get('max', float('inf'))
-            out_of_range_mask = (numeric_col < min_val) | (numeric_col > max_val)
-            if out_of_range_mask.any():
-                flag_col_name = f"{col_name}_flag"
-                if flag_col_name not in df_out.columns:
-                    df_out[flag_col_name] = 0
-
-                df_out[flag_col_name] = pd.to_numeric(df_out[flag_col_name], errors='coerce').fillna(0).astype(int)
-
-                # Only update flags that are currently 0
-                update_mask = out_of_range_mask & (df_out[flag_col_name] == 0)
-                df_out.loc[update_mask, flag_col_name] = 4
+
+    # Kolumna jest sprawdzana względem każdego pasującego prefiksu, co jest
+    # równoważne jednemu testowi z najwęższym zakresem (max z min, min z max)
+    # Zakres per nazwa kolumny z pamięci podręcznej; trie przechodzone tylko dla nowych nazw
+    targets = []
+    for col_name in df_out.columns:
+        col_range = _range_for_column(str(col_name))
+        if col_range is not None:
+            targets.append((col_name, col_range[0], col_range[1]))
+    if not targets:
+        return df_out
+
+    if NUMBA_AVAILABLE and len(df_out) * len(targets) >= _NUMBA_RANGE_THRESHOLD:
+        return _apply_value_range_flags_numba(df_out, targets)
+
+    # Nowe kolumny flag dodawane na końcu, w kolejności pętli po prefiksach (jak dotąd)
+    new_flags = []
+    for col_name, min_val, max_val in targets:
+        values = pd.to_numeric(df_out[col_name], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        out_of_range_mask = (values < min_val) | (values > max_val)
+        if out_of_range_mask.any():
+            flag_col_name = f"{col_name}_flag"
+            if flag_col_name in df_out.columns:
+                existing = pd.to_numeric(df_out[flag_col_name], errors='coerce').fillna(0).astype(int).to_numpy(copy=True)
+            else:
+                existing = np.zeros(len(df_out), dtype=np.int8)
+
+            # Only update flags that are currently 0 - jedno połączenie zamiast maski i .loc
+            np.copyto(existing, 4, where=out_of_range_mask & (existing == 0))
+            if flag_col_name in df_out.columns:
+                df_out[flag_col_name] = _narrow_flags(existing)
+            else:
+                new_flags.append((col_name, values, existing))
+    _insert_range_flag_columns(df_out, new_flags)
     return df_out
 
+@dataclass(frozen=True, slots=True)
+class QFInterval:
+    """Skompilowana reguła flagowania QUALITY_FLAGS (lżejsza od słownika, daty już sparsowane)."""
+    start: np.datetime64
+    end: np.datetime64
+    flag_value: int
+    reason: str = ''
+    filename_contains: Optional[str] = None
+
+# Skompilowane reguły QF per zestaw (budowane leniwie).
+# Klucz: nazwa zestawu; wartość: (id słownika reguł, {kolumna: krotka QFInterval}).
+_QF_RULES_CACHE: Dict[str, tuple] = {}
+
+def _batch_parse_rule_datetimes(values) -> Dict[str, np.datetime64]:
+    """
+    Parsuje unikalne daty (napisy) reguł jednym wektorowym wywołaniem pd.to_datetime
+    (format wykrywany raz) zamiast osobnego wywołania na każdą granicę. Zwraca tylko
+    poprawnie sparsowane; pozostałe parsuje _rule_datetime pojedynczo (z tym samym błędem).
+    """
+    strings = list({v for v in values if isinstance(v, str)})
+    if not strings:
+        return {}
+    try:
+        parsed = pd.to_datetime(pd.Index(strings), errors='coerce')
+        if parsed.tz is not None:
+            return {}
+        parsed = parsed.as_unit('ns').to_numpy()
+    except (ValueError, TypeError):
+        return {}
+    return {s: ts for s, ts in zip(strings, parsed) if not np.isnat(ts)}
+
+def _rule_datetime(value, parsed: Dict[str, np.datetime64]) -> np.datetime64:
+    """Granica reguły jako datetime64[ns] - z wyniku _batch_parse_rule_datetimes lub parsowana osobno."""
+    ts = parsed.get(value) if isinstance(value, str) else None
+    if ts is None:
+        ts = pd.to_datetime(value).as_unit('ns').to_datetime64()
+    return ts
+
+def _coalesce_qf_intervals(intervals: List[QFInterval]) -> tuple:
+    """
+    Scala nakładające się/stykające przedziały o tej samej fladze i filtrze nazwy pliku.
+    Reguła jest doklejana do wcześniejszej tylko wtedy, gdy żadna reguła pomiędzy nimi
+    nie zachodzi na nią - dzięki temu zachowana jest zasada "wygrywa pierwsza reguła".
+    """
+    merged: List[QFInterval] = []
+    # Granice jako int (ns) - porównania skalarów np.datetime64 są wielokrotnie wolniejsze
+    spans: List[tuple] = []
+    for iv in intervals:
+        start_i, end_i = (int(t.astype('datetime64[ns]').astype(np.int64)) for t in (iv.start, iv.end))
+        target = None
+        for pos in range(len(merged) - 1, -1, -1):
+            prev_start, prev_end = spans[pos]
+            overlaps = start_i <= prev_end and prev_start <= end_i
+            if not overlaps:
+                continue
+            prev = merged[pos]
+            if prev.flag_value == iv.flag_value and prev.filename_contains == iv.filename_contains:
+                target = pos
+            break
+        if target is None:
+            merged.append(iv)
+            spans.append((start_i, end_i))
+        else:
+            prev = merged[target]
+            merged[target] = QFInterval(
+                start=min(prev.start, iv.start), end=max(prev.end, iv.end),
+                flag_value=prev.flag_value, reason=prev.reason, filename_contains=prev.filename_contains,
+            )
+            spans[target] = (min(spans[target][0], start_i), max(spans[target][1], end_i))
+    return tuple(merged)
+
+def _compile_qf_rules(ruleset_name: str, station_rules: dict) -> Dict[str, tuple]:
+    """Zamienia listy słowników reguł QF na krotki QFInterval. Błędne reguły są pomijane z ostrzeżeniem."""
+    cached = _QF_RULES_CACHE.get(ruleset_name)
+    if cached is not None and cached[0] == id(station_rules):
+        return cached[1]
+
+    parsed = _batch_parse_rule_datetimes(
+        value for rules_list in station_rules.values() for rule in rules_list
+        for value in (rule.get('start'), rule.get('end')))
+    compiled = {}
+    for col_to_flag, rules_list in station_rules.items():
+        intervals = []
+        for rule in rules_list:
+            try:
+                intervals.append(QFInterval(
+                    start=_rule_datetime(rule['start'], parsed),
+                    end=_rule_datetime(rule['end'], parsed),
+                    flag_value=int(rule['flag_value']),
+                    reason=rule.get('reason', ''),
+                    filename_contains=rule.get('filename_contains') or None,
+                ))
+            except Exception as e:
+                logging.warning(f"Błąd reguły flagowania w zestawie '{ruleset_name}' (kolumna: {col_to_flag}): {e}")
+        compiled[col_to_flag] = _coalesce_qf_intervals(intervals)
+    _QF_RULES_CACHE[ruleset_name] = (id(station_rules), compiled)
+    return compiled
+
+# Skompilowane filtry 'filename_contains' per zestaw reguł QF (budowane leniwie).
+# Klucz: nazwa zestawu; wartość: (id słownika reguł, regex, mapa grupa -> fragment, prefiksy).
+_FNAME_RE: Dict[str, tuple] = {}
+
+def _compile_filename_filters(ruleset_name: str, station_rules: dict) -> tuple:
+    """
+    Kompiluje wszystkie fragmenty 'filename_contains' z danego zestawu reguł
+    do jednego wyrażenia regularnego z nazwanymi grupami, tak aby nazwa pliku
+    była skanowana tylko raz (zamiast N sprawdzeń `in`).
+    """
+    cached = _FNAME_RE.get(ruleset_name)
+    if cached is not None and cached[0] == id(station_rules):
+        return cached[1:]
+
+    substrings = sorted(
+        {rule['filename_contains'] for rules in station_rules.values() for rule in rules if rule.get('filename_contains')},
+        key=len, reverse=True,
+    )
+    if not substrings:
+        compiled = (None, {}, {})
+    else:
+        group_map = {f"s{i}": sub for i, sub in enumerate(substrings)}
+        # Lookahead pozwala wykrywać dopasowania nakładające się na siebie
+        pattern = re.compile('(?=' + '|'.join(f"(?P<{g}>{re.escape(s)})" for g, s in group_map.items()) + ')')
+        # Alternatywa zwraca tylko najdłuższy fragment na danej pozycji - krótsze, będące jego prefiksami, dopisujemy
+        prefixes = {s: [p for p in substrings if p != s and s.startswith(p)] for s in substrings}
+        compiled = (pattern, group_map, prefixes)
+    _FNAME_RE[ruleset_name] = (id(station_rules),) + compiled
+    return compiled
+
+def _filename_filter_masks(source_file: pd.Series, ruleset_name: str, station_rules: dict) -> Dict[str, np.ndarray]:
+    """Zwraca {fragment: maska wierszy}, skanując każdą unikalną nazwę pliku jeden raz."""
+    pattern, group_map, prefixes = _compile_filename_filters(ruleset_name, station_rules)
+    if pattern is None:
+        return {}
+
+    codes, uniques = pd.factorize(source_file)
+    hits = {sub: np.zeros(len(uniques) + 1, dtype=bool) for sub in group_map.values()}
+    for u_idx, fname in enumerate(uniques):
+        for m in pattern.finditer(str(fname)):
+            sub = group_map[m.lastgroup]
+            hits[sub][u_idx] = True
+            for p in prefixes[sub]:
+                hits[p][u_idx] = True
+    # Kod -1 (NaN) trafia na ostatni, zawsze fałszywy element
+    return {sub: hit[codes] for sub, hit in hits.items()}
+
+# Tablica dyspozycji grupa -> (nazwa zestawu, słownik reguł lub None, reguły skompilowane) lub None,
+# analogicznie do _CALIBRATION_DISPATCH.
+_QF_DISPATCH: Dict[str, Optional[tuple]] = {}
+_QF_DISPATCH_SOURCE: Optional[tuple] = None
+
+def _qf_dispatch(group_id: str) -> Optional[tuple]:
+    """Zwraca (nazwa zestawu, reguły, skompilowane reguły) dla grupy lub None, gdy grupa nie ma zestawu QF."""
+    global _QF_DISPATCH_SOURCE
+    source = (id(STATION_MAPPING_FOR_QC), id(QUALITY_FLAGS))
+    if _QF_DISPATCH_SOURCE != source:
+        _QF_DISPATCH.clear()
+        _QF_DISPATCH_SOURCE = source
+    try:
+        return _QF_DISPATCH[group_id]
+    except KeyError:
+        pass
+    ruleset_name = STATION_MAPPING_FOR_QC.get(group_id)
+    entry = None
+    if ruleset_name:
+        station_rules = QUALITY_FLAGS.get(ruleset_name)
+        compiled = _compile_qf_rules(ruleset_name, station_rules) if station_rules else None
+        entry = (ruleset_name, station_rules, compiled)
+    _QF_DISPATCH[sys.intern(group_id)] = entry
+    return entry
+
 def apply_quality_flags(df: pd.DataFrame, config: dict) -> pd.DataFrame:
     """
     Dodaje flagi jakości, używając dwuetapowego systemu słowników.
@@ -1008,22 +2110,28 @@ def apply_quality_flags(df: pd.DataFrame, config: dict) -> pd.DataFrame:
     if not group_id or df.empty:
         return df
 
-    # Krok 1: Znajdź nazwę zestawu reguł dla danej grupy
-    ruleset_name = STATION_MAPPING_FOR_QC.get(group_id)
-    if not ruleset_name:
+    # Krok 1 i 2: nazwa zestawu reguł dla grupy i właściwy słownik z QUALITY_FLAGS (jedno wyszukiwanie)
+    dispatch = _qf_dispatch(group_id)
+    if dispatch is None:
         return df  # Celowy brak reguł dla tej grupy
-
-    # --- POCZĄTEK POPRAWKI ---
-    # Krok 2: Pobierz właściwy słownik z regułami z QUALITY_FLAGS (a nie STATION_MAPPING_FOR_QC)
-    station_rules = QUALITY_FLAGS.get(ruleset_name)
-    # --- KONIEC POPRAWKI ---
+    ruleset_name, station_rules, compiled_rules = dispatch
     if not station_rules:
         logging.warning(f"Nie znaleziono definicji reguł '{ruleset_name}' w QUALITY_FLAGS dla grupy '{group_id}'.")
         return df
 
     df_out = df.copy()
-    # ... (reszta funkcji pozostaje bez zmian) ...
-    for col_to_flag, rules_list in station_rules.items():
+    fname_masks = {}
+    if 'source_file' in df_out.columns:
+        fname_masks = _filename_filter_masks(df_out['source_file'], ruleset_name, station_rules)
+
+    timestamps = df_out['TIMESTAMP'].to_numpy()
+    if timestamps.dtype.kind == 'M':
+        # Ta sama jednostka (ns) co granice reguł - porównania bez rzutowania
+        timestamps = timestamps.astype('datetime64[ns]', copy=False)
+    # Sortowanie i granice przedziałów liczone raz na plik, wspólne dla wszystkich kolumn
+    sorted_view = _sorted_qf_view(timestamps, fname_masks)
+    bounds_cache: dict = {}
+    for col_to_flag, intervals in compiled_rules.items():
         if col_to_flag == '*':
             target_cols = [c for c in df_out.select_dtypes(include='number').columns if not c.endswith('_flag')]
         elif col_to_flag in df_out.columns:
@@ -1031,36 +2139,171 @@ def apply_quality_flags(df: pd.DataFrame, config: dict) -> pd.DataFrame:
         else:
             continue
 
-        for rule in rules_list:
-            try:
-                start_ts = pd.to_datetime(rule['start'])
-                end_ts = pd.to_datetime(rule['end'])
-                final_mask = (df_out['TIMESTAMP'] >= start_ts) & (df_out['TIMESTAMP'] <= end_ts)
-
-                filename_filter = rule.get('filename_contains')
-                if filename_filter:
-                    if 'source_file' in df_out.columns:
-                        file_mask = df_out['source_file'].str.contains(filename_filter, na=False, regex=False)
-                        final_mask &= file_mask
-                    else:
-                        continue
-                
-                if final_mask.any():
-                    for col_name in target_cols:
-                        flag_col_name = f"{col_name}_flag"
-                        if flag_col_name not in df_out.columns:
-                            df_out[flag_col_name] = 0
+        bitmap = build_qf_bitmap(intervals, timestamps, fname_masks, sorted_view, bounds_cache)
+        # Kolumna flag powstaje (z zerami) także wtedy, gdy pasują wyłącznie reguły z flagą 0
+        if not bitmap.any() and not _qf_zero_rules_match(intervals, timestamps, fname_masks):
+            continue
 
-                        df_out[flag_col_name] = pd.to_numeric(df_out[flag_col_name], errors='coerce').fillna(0).astype(int)
+        for col_name in target_cols:
+            flag_col_name = f"{col_name}_flag"
+            if flag_col_name in df_out.columns:
+                flags = pd.to_numeric(df_out[flag_col_name], errors='coerce').fillna(0).astype(int).to_numpy()
+                # Only update flags that are currently 0 - jedno np.where zamiast maski i dwóch indeksowań
+                flags = np.where(flags == 0, bitmap, flags)
+            else:
+                flags = bitmap
+            df_out[flag_col_name] = _narrow_flags(flags)
 
-                        # Only update flags that are currently 0
-                        update_mask = final_mask & (df_out[flag_col_name] == 0)
-                        df_out.loc[update_mask, flag_col_name] = rule['flag_value']
-            except Exception as e:
-                logging.warning(f"Błąd reguły flagowania dla '{group_id}' (kolumna: {col_to_flag}): {e}")
-                
     return df_out
 
+def _is_sorted_datetime(timestamps: np.ndarray) -> bool:
+    """Czy tablica datetime64 jest niemalejąca i bez NaT (warunek wyszukiwania binarnego)."""
+    if timestamps.dtype.kind != 'M' or len(timestamps) == 0:
+        return False
+    if np.isnat(timestamps[0]) or np.isnat(timestamps[-1]):
+        return False
+    # NaT w środku psuje porównanie (NaT >= x jest fałszem), więc też odrzuca
+    return bool(np.all(timestamps[1:] >= timestamps[:-1]))
+
+def _sorted_qf_view(timestamps: np.ndarray, fname_masks: Dict[str, np.ndarray]) -> Optional[tuple]:
+    """
+    (kolejność lub None, posortowane znaczniki, maski nazw plików w tej kolejności) dla
+    tablicy datetime64; None dla innych typów. Liczone raz na plik, wspólne dla kolumn.
+    """
+    if timestamps.dtype.kind != 'M' or len(timestamps) == 0:
+        return None
+    if _is_sorted_datetime(timestamps):
+        return None, timestamps, fname_masks
+    # Nieposortowane: jedno sortowanie indeksów (bez NaT), wynik rozrzucany z powrotem
+    order = np.flatnonzero(~np.isnat(timestamps))
+    order = order[np.argsort(timestamps[order], kind='stable')]
+    return order, timestamps[order], {k: m[order] for k, m in fname_masks.items()}
+
+# Indeks okien czasowych list reguł QF: id krotki -> (krotka, posortowane początki, kolejność, końce)
+_QF_WINDOW_INDEX: Dict[int, tuple] = {}
+_QF_WINDOW_INDEX_MAX = 256
+
+def _qf_window_candidates(intervals: tuple, t_min: np.datetime64, t_max: np.datetime64) -> np.ndarray:
+    """
+    Pozycje reguł, których przedział zachodzi na [t_min, t_max], rosnąco (kolejność
+    pierwszeństwa). Początki posortowane raz na listę - reguły zaczynające się po
+    t_max odcina jedno wyszukiwanie binarne, resztę filtr końców.
+    """
+    entry = _QF_WINDOW_INDEX.get(id(intervals))
+    if entry is None or entry[0] is not intervals:
+        if len(_QF_WINDOW_INDEX) >= _QF_WINDOW_INDEX_MAX:
+            _QF_WINDOW_INDEX.clear()
+        starts = np.array([iv.start for iv in intervals], dtype='datetime64[ns]')
+        ends = np.array([iv.end for iv in intervals], dtype='datetime64[ns]')
+        order = np.argsort(starts, kind='stable')
+        entry = _QF_WINDOW_INDEX[id(intervals)] = (intervals, starts[order], order, ends)
+    _, starts_sorted, order, ends = entry
+    candidates = order[:np.searchsorted(starts_sorted, t_max, side='right')]
+    return np.sort(candidates[ends[candidates] >= t_min])
+
+def _fill_qf_bitmap_sorted(bitmap: np.ndarray, intervals: tuple, timestamps: np.ndarray,
+                           fname_masks: Dict[str, np.ndarray], bounds_cache: Optional[dict] = None) -> None:
+    """
+    Wypełnia bitmapę dla posortowanych znaczników: każdy przedział to ciągły wycinek [i0, i1).
+    bounds_cache ((start, end) -> (i0, i1)) pozwala dzielić wyszukiwania między kolumnami pliku.
+    """
+    if len(timestamps) == 0:
+        return
+    if bounds_cache is None:
+        bounds_cache = {}
+    # Tylko reguły zachodzące na zakres pliku (pierwszy/ostatni znacznik), w kolejności z listy
+    intervals = [intervals[k] for k in _qf_window_candidates(intervals, timestamps[0], timestamps[-1])]
+    missing = list({(iv.start, iv.end) for iv in intervals if (iv.start, iv.end) not in bounds_cache})
+    if missing:
+        lo = np.searchsorted(timestamps, np.array([b[0] for b in missing]), side='left')
+        hi = np.searchsorted(timestamps, np.array([b[1] for b in missing]), side='right')
+        bounds_cache.update(zip(missing, zip(lo.tolist(), hi.tolist())))
+    # Zapis w odwrotnej kolejności bez warunku: ostatni zapis pochodzi od najwcześniejszej
+    # reguły, czyli "wygrywa pierwsza reguła" bez masek bitmap == 0 (bitmapa startuje od zer,
+    # reguły z flagą 0 nic nie zmieniają). Reguły jednopróbkowe (np. 'spike') bez filtra
+    # nazwy pliku są zbierane i zapisywane jednym przypisaniem indeksowym.
+    point_rows: List[int] = []
+    point_values: List[int] = []
+    for iv in reversed(intervals):
+        i0, i1 = bounds_cache[(iv.start, iv.end)]
+        if i1 <= i0 or iv.flag_value == 0:
+            continue
+        if iv.filename_contains:
+            if iv.filename_contains not in fname_masks:
+                continue
+            _flush_point_flags(bitmap, point_rows, point_values)
+            segment = bitmap[i0:i1]
+            segment[fname_masks[iv.filename_contains][i0:i1]] = iv.flag_value
+        elif i1 - i0 == 1:
+            point_rows.append(i0)
+            point_values.append(iv.flag_value)
+        else:
+            _flush_point_flags(bitmap, point_rows, point_values)
+            bitmap[i0:i1] = iv.flag_value
+    _flush_point_flags(bitmap, point_rows, point_values)
+
+def _flush_point_flags(bitmap: np.ndarray, rows: List[int], values: List[int]) -> None:
+    """Zapisuje zebrane flagi jednopróbkowe (kolejność zapisu zachowana dla powtórzonych wierszy)."""
+    if not rows:
+        return
+    if len(set(rows)) == len(rows):
+        bitmap[rows] = values
+    else:
+        for row, value in zip(rows, values):
+            bitmap[row] = value
+    rows.clear()
+    values.clear()
+
+def build_qf_bitmap(intervals: tuple, timestamps: np.ndarray, fname_masks: Optional[Dict[str, np.ndarray]] = None,
+                    sorted_view: Optional[tuple] = None, bounds_cache: Optional[dict] = None) -> np.ndarray:
+    """
+    Zamienia skompilowane reguły QF jednej zmiennej (lub '*') na wektor uint8
+    flag dla podanych znaczników czasu (0 = brak flagi). Przy nakładających
+    się przedziałach wygrywa pierwsza reguła z listy - tak jak przy
+    sekwencyjnym nadawaniu flag tylko tam, gdzie flaga jest jeszcze równa 0.
+    sorted_view i bounds_cache (z _sorted_qf_view) można przekazać, by nie
+    sortować i nie wyszukiwać ponownie dla każdej kolumny tego samego pliku.
+    """
+    bitmap = np.zeros(len(timestamps), dtype=np.uint8)
+    fname_masks = fname_masks or {}
+    if intervals and sorted_view is None:
+        sorted_view = _sorted_qf_view(timestamps, fname_masks)
+    if intervals and sorted_view is not None:
+        order, ts_sorted, fname_sorted = sorted_view
+        if order is None:
+            _fill_qf_bitmap_sorted(bitmap, intervals, ts_sorted, fname_sorted, bounds_cache)
+        else:
+            sub = np.zeros(len(order), dtype=np.uint8)
+            _fill_qf_bitmap_sorted(sub, intervals, ts_sorted, fname_sorted, bounds_cache)
+            bitmap[order] = sub
+        return bitmap
+    for iv in intervals:
+        rule_mask = (timestamps >= iv.start) & (timestamps <= iv.end)
+        if iv.filename_contains:
+            if iv.filename_contains not in fname_masks:
+                continue
+            rule_mask &= fname_masks[iv.filename_contains]
+        rule_mask &= bitmap == 0
+        bitmap[rule_mask] = iv.flag_value
+    return bitmap
+
+def _qf_zero_rules_match(intervals: tuple, timestamps: np.ndarray, fname_masks: Dict[str, np.ndarray]) -> bool:
+    """
+    Czy któraś reguła z flagą 0 obejmuje choć jeden wiersz. Reguły z niezerową flagą
+    widać w bitmapie; te z flagą 0 nie zmieniają jej, a mimo to tworzą kolumnę flag.
+    """
+    for iv in intervals:
+        if iv.flag_value != 0:
+            continue
+        rule_mask = (timestamps >= iv.start) & (timestamps <= iv.end)
+        if iv.filename_contains:
+            if iv.filename_contains not in fname_masks:
+                continue
+            rule_mask &= fname_masks[iv.filename_contains]
+        if rule_mask.any():
+            return True
+    return False
+
 def align_timestamp(df: pd.DataFrame, force_interval: str) -> pd.DataFrame:
     """Rounds timestamps to a specified frequency."""
     if df.empty or not force_interval: return df
@@ -1072,50 +2315,55 @@ def align_timestamp(df: pd.DataFrame, force_interval: str) -> pd.DataFrame:
 
 def filter_by_realistic_date_range(df: pd.DataFrame, file_path: Path) -> pd.DataFrame:
     """
-    (WERSJA DOCELOWA 2.2) Usuwa wiersze z nierealistycznymi znacznikami czasu.
+    (WERSJA DOCELOWA 2.3) Usuwa wiersze z nierealistycznymi znacznikami czasu.
     Ujednolica strefy czasowe przed porównaniem, aby uniknąć błędów.
+    Dla posortowanych znaczników zakres wyznaczają dwa np.searchsorted zamiast masek.
     """
     if df.empty or 'TIMESTAMP' not in df.columns:
         return df
 
     try:
-        # Krok 1: Wstępne czyszczenie i konwersja (bez zmian)
-        timestamps_str = df['TIMESTAMP'].astype(str)
-        cleaned_timestamps_str = timestamps_str.str.replace('.0-', '-', regex=False)
-        timestamps_series = pd.to_datetime(cleaned_timestamps_str, errors='coerce')
+        # Krok 1: Wstępne czyszczenie i konwersja; kolumna już typu datetime (TOB1/TOA5)
+        # nie wymaga przejścia przez tekst
+        if pd.api.types.is_datetime64_any_dtype(df['TIMESTAMP']):
+            timestamps_series = df['TIMESTAMP']
+        else:
+            timestamps_str = df['TIMESTAMP'].astype(str)
+            cleaned_timestamps_str = timestamps_str.str.replace('.0-', '-', regex=False)
+            timestamps_series = pd.to_datetime(cleaned_timestamps_str, errors='coerce')
 
         # Krok 2: Wstępne filtrowanie na podstawie poprawności dat
         valid_mask = timestamps_series.notna()
-        df = df[valid_mask]
-        timestamps = timestamps_series[valid_mask]
-
-        if timestamps.empty:
-            return df
-
-        # === POCZĄTEK KLUCZOWEJ ZMIANY ===
-
-        # Krok 3: Ujednolicenie danych do strefy UTC na potrzeby porównania
-        if timestamps.dt.tz is None:
-            # Jeśli dane są "naiwne", przypisujemy im strefę UTC
-            timestamps_utc = timestamps.dt.tz_localize('UTC')
-        else:
-            # Jeśli dane już mają strefę, konwertujemy je do UTC
-            timestamps_utc = timestamps.dt.tz_convert('UTC')
-
-        # Krok 4: Wyznaczenie mediany z danych w UTC
-        median_year = timestamps_utc.dt.year.median()
+        if not valid_mask.all():
+            df = df[valid_mask]
+            timestamps = timestamps_series[valid_mask]
+        else:
+            timestamps = timestamps_series
 
-        # Krok 5: Stworzenie dat granicznych, RÓWNIEŻ w strefie UTC
-        start_date_utc = pd.Timestamp(f'{int(median_year) - 2}-01-01', tz='UTC')
-        end_date_utc = pd.Timestamp(f'{int(median_year) + 2}-12-31', tz='UTC')
+        if timestamps.empty:
+            return df
 
-        # Krok 6: Wykonanie bezpiecznego porównania (obie strony są w UTC)
-        final_mask = (timestamps_utc >= start_date_utc) & (timestamps_utc <= end_date_utc)
-        
-        # === KONIEC KLUCZOWEJ ZMIANY ===
+        # Krok 3: Ujednolicenie danych do (naiwnego) UTC na potrzeby porównania
+        if timestamps.dt.tz is not None:
+            timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
 
-        # Zastosuj ostateczną maskę do przefiltrowanego już DataFrame
-        filtered_df = df.loc[final_mask]
+        # Krok 4: Wyznaczenie mediany z danych w UTC
+        median_year = timestamps.dt.year.median()
+
+        # Krok 5: Daty graniczne, również w UTC
+        start_date_utc = np.datetime64(f'{int(median_year) - 2}-01-01')
+        end_date_utc = np.datetime64(f'{int(median_year) + 2}-12-31')
+
+        # Krok 6: Posortowane znaczniki - wycinek po dwóch wyszukiwaniach binarnych;
+        # w przeciwnym razie maska logiczna
+        ts_values = timestamps.to_numpy()
+        if timestamps.is_monotonic_increasing:
+            lo = np.searchsorted(ts_values, start_date_utc, side='left')
+            hi = np.searchsorted(ts_values, end_date_utc, side='right')
+            filtered_df = df.iloc[lo:hi]
+        else:
+            final_mask = (ts_values >= start_date_utc) & (ts_values <= end_date_utc)
+            filtered_df = df.loc[final_mask]
 
         rows_removed = len(df) - len(filtered_df)
         if rows_removed > 0:
@@ -1416,16 +2664,20 @@ def diagnose_chronology(df: pd.DataFrame, context_name: str, known_interval: str
     # Zwróć oryginalną, niezmodyfikowaną ramkę danych
     return df
     
+def rename_for_group(df: pd.DataFrame, group_id: str) -> pd.DataFrame:
+    """Zmienia nazwy kolumn (w miejscu) według słownika przypisanego do grupy w GROUP_TO_COLUMN_MAP."""
+    mapping_dict = GROUP_TO_COLUMN_MAP.get(group_id)
+    if mapping_dict and not GROUP_TO_COLUMN_KEYS[group_id].isdisjoint(df.columns):
+        # Bezpośrednie przepisanie indeksu kolumn - jedno wyszukiwanie w słowniku na kolumnę
+        get = mapping_dict.get
+        df.columns = df.columns.map(lambda c: get(c, c))
+    return df
+
 def apply_column_mapping(df: pd.DataFrame, config: dict) -> pd.DataFrame:
     # rename columns based on mapping rules
     file_id = config.get('file_id')
     if not file_id: return df
-    ruleset_name = STATION_MAPPING_FOR_COLUMNS.get(file_id)
-    if not ruleset_name: return df
-    mapping_dict = COLUMN_MAPPING_RULES.get(ruleset_name)
-    if not mapping_dict: return df
-    df.rename(columns=mapping_dict, inplace=True)
-    return df
+    return rename_for_group(df, file_id)
 
 def clean_column_names(df: pd.DataFrame) -> pd.DataFrame:
     """Removes sync-conflict suffixes from column names."""
@@ -1472,40 +2724,96 @@ def _sanitize_column_names(df: pd.DataFrame) -> pd.DataFrame:
         
     return df
     
+# Kolumny tekstowe/metadanych, których _enforce_numeric_types nie konwertuje
+_NON_NUMERIC_COLUMNS = frozenset([
+    'TIMESTAMP', 'group_id', 'source_file', 'interval', 'TZ', '5M METAR Tab.4678',
+    '1M METAR Tab.4678', '5MMETARTab4678', '1MMETARTab4678', 'source_filename',
+    'source_filepath', 'http_header' , 'http_post_response', 'http_post_tx', 'file_handle',
+    'OSSignature', 'OSDate', 'OSVersion', 'ProgName', 'RevBoard'])
+
 def _enforce_numeric_types(df: pd.DataFrame) -> pd.DataFrame:
     """
     Wymusza konwersję kolumn na typ numeryczny, ze specjalnym traktowaniem kolumn flag.
     Wersja 7.13: Dodano agresywną konwersję kolumn '_flag' na typ integer.
+    Kolumny już w docelowym typie (liczbowe; flagi jako int) są pomijane bez kopiowania.
     """
-    cols_to_skip = ['TIMESTAMP', 'group_id', 'source_file', 'interval', 'TZ', '5M METAR Tab.4678', 
-    '1M METAR Tab.4678', '5MMETARTab4678', '1MMETARTab4678', 'source_filename', 
-    'source_filepath', 'http_header' , 'http_post_response', 'http_post_tx', 'file_handle', 
-    'OSSignature', 'OSDate', 'OSVersion', 'ProgName', 'RevBoard']
-
     for col in df.columns:
-        if col in cols_to_skip:
+        if col in _NON_NUMERIC_COLUMNS:
             continue
+        dtype = df[col].dtype
 
         # --- POCZĄTEK NOWEJ LOGIKI ---
         # Specjalne, agresywne traktowanie kolumn z flagami
         if col.endswith('_flag'):
+            if _is_integer_dtype(dtype):
+                continue  # Już integer bez braków (np. int8 z build_qf_bitmap) - bez kopii
             # Krok 1: Konwertuj na liczbę (błędy zamień na NaN).
             # Krok 2: Wypełnij ewentualne braki (NaN) wartością 0 (dane dobre).
-            # Krok 3: Rzutuj na typ integer.
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+            # Krok 3: Rzutuj na typ integer, zawężony do int8, gdy wartości się mieszczą.
+            df[col] = _narrow_flags(pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int).to_numpy())
             continue  # Przejdź do następnej kolumny
         # --- KONIEC NOWEJ LOGIKI ---
 
         # Standardowa obsługa pozostałych kolumn z danymi
-        if not pd.api.types.is_numeric_dtype(df[col]):
-            original_dtype = df[col].dtype
+        if not pd.api.types.is_numeric_dtype(dtype):
             df[col] = pd.to_numeric(df[col], errors='coerce')
             
-            if df[col].dtype != original_dtype:
-                logging.debug(f"Konwersja kolumny '{col}' z typu {original_dtype} na {df[col].dtype}.")
+            if df[col].dtype != dtype:
+                logging.debug("Konwersja kolumny '%s' z typu %s na %s.", col, dtype, df[col].dtype)
     
     return df
     
+# Reguły nadpisywania z już sparsowanymi datami (budowane leniwie).
+# Klucz: nazwa zestawu; wartość: (id słownika reguł,
+#   {kolumna: ([(start, end, new_value, reason), ...], IntervalIndex | None, tablica new_value | None)}).
+_OVERRIDE_RULES_CACHE: Dict[str, tuple] = {}
+
+def _compile_override_rules(ruleset_name: str, station_rules: dict) -> Dict[str, tuple]:
+    """
+    Parsuje 'start'/'end' reguł MANUAL_VALUE_OVERRIDES do pd.Timestamp jeden raz na zestaw
+    i buduje dla każdej kolumny IntervalIndex (closed='both') wraz z tablicą nowych wartości
+    indeksowaną numerem reguły. Gdy przedziały się nakładają, indeks nie powstaje (None)
+    - wtedy reguły stosowane są sekwencyjnie.
+    """
+    cached = _OVERRIDE_RULES_CACHE.get(ruleset_name)
+    if cached is not None and cached[0] == id(station_rules):
+        return cached[1]
+
+    compiled = {}
+    for col_name, rules_list in station_rules.items():
+        parsed = []
+        for rule in rules_list:
+            try:
+                parsed.append((pd.to_datetime(rule['start']), pd.to_datetime(rule['end']),
+                               rule['new_value'], rule.get('reason', 'Brak powodu.')))
+            except Exception as e:
+                logging.error(f"Błąd podczas stosowania reguły nadpisywania dla '{col_name}': {e}")
+        interval_index = None
+        new_values = None
+        if parsed:
+            interval_index = pd.IntervalIndex.from_arrays(
+                [r[0] for r in parsed], [r[1] for r in parsed], closed='both')
+            if interval_index.is_overlapping:
+                interval_index = None
+            else:
+                new_values = np.asarray([r[2] for r in parsed])
+        compiled[col_name] = (parsed, interval_index, new_values)
+    _OVERRIDE_RULES_CACHE[ruleset_name] = (id(station_rules), compiled)
+    return compiled
+
+def get_overrides(file_id: str) -> Dict[str, tuple]:
+    """
+    Zwraca skompilowane reguły nadpisywania dla grupy: bezpośredni łańcuch
+    wyszukiwań grupa -> zestaw -> reguły (O(1)), pusty słownik gdy brak reguł.
+    """
+    ruleset_name = STATION_MAPPING_FOR_OVERRIDES.get(file_id)
+    if not ruleset_name:
+        return {}
+    station_rules = MANUAL_VALUE_OVERRIDES.get(ruleset_name)
+    if not station_rules:
+        return {}
+    return _compile_override_rules(ruleset_name, station_rules)
+
 def apply_manual_overrides(df: pd.DataFrame, config: dict) -> pd.DataFrame:
     """
     Overwrites values in specified columns and time ranges based on config.
@@ -1516,28 +2824,38 @@ def apply_manual_overrides(df: pd.DataFrame, config: dict) -> pd.DataFrame:
         return df
 
     # Find the correct ruleset for the given group_id
-    ruleset_name = STATION_MAPPING_FOR_OVERRIDES.get(group_id)
-    if not ruleset_name:
-        return df
-
-    station_rules = MANUAL_VALUE_OVERRIDES.get(ruleset_name)
-    if not station_rules:
+    overrides = get_overrides(group_id)
+    if not overrides:
         return df
 
     df_out = df.copy()
 
-    for col_name, rules_list in station_rules.items():
+    timestamps = None
+    for col_name, (rules_list, interval_index, new_values) in overrides.items():
         if col_name not in df_out.columns:
             logging.warning(f"Nadpisywanie wartości: Kolumna '{col_name}' nie istnieje w danych dla grupy '{group_id}'.")
             continue
 
-        for rule in rules_list:
+        if interval_index is not None:
             try:
-                start_ts = pd.to_datetime(rule['start'])
-                end_ts = pd.to_datetime(rule['end'])
-                new_value = rule['new_value']
-                reason = rule.get('reason', 'Brak powodu.')
+                if timestamps is None:
+                    timestamps = pd.DatetimeIndex(df_out['TIMESTAMP'])
+                # Jedno wyszukiwanie dla wszystkich reguł kolumny: numer reguły lub -1
+                hits = interval_index.get_indexer(timestamps)
+                selected = hits >= 0
+                if selected.any():
+                    df_out.loc[selected, col_name] = new_values[hits[selected]]
+                    counts = np.bincount(hits[selected], minlength=len(rules_list))
+                    for (_, _, new_value, reason), count in zip(rules_list, counts):
+                        if count:
+                            logging.info(f"Nadpisano {count} wartości w kolumnie '{col_name}' na '{new_value}'. Powód: {reason}")
+                continue
+            except Exception as e:
+                # Awaryjnie przechodzimy do sekwencyjnego stosowania reguł poniżej
+                logging.debug(f"Nadpisywanie przez IntervalIndex nieudane dla '{col_name}': {e}")
 
+        for start_ts, end_ts, new_value, reason in rules_list:
+            try:
                 mask = (df_out['TIMESTAMP'] >= start_ts) & (df_out['TIMESTAMP'] <= end_ts)
 
                 if mask.any():
@@ -1554,46 +2872,38 @@ def _ensure_flag_columns_exist(df: pd.DataFrame) -> pd.DataFrame:
     Zapewnia, że dla każdej numerycznej kolumny danych istnieje odpowiednia kolumna '_flag'.
     Wersja 7.76 FINAL: Implementuje nową logikę flag domyślnych (99 dla NaN, 0 dla wartości).
     """
-    df = df.copy() # Defragmentacja na wejściu
-
     cols_to_skip = [
         'TIMESTAMP', 'group_id', 'source_file', 'interval', 
         'latitude', 'longitude', 'source_filepath', 
         'source_filename', 'original_row_index', 'RECORD'
     ]
     
-    # Słownik do przechowania danych dla nowych kolumn flag
-    new_cols_data = {}
-    
-    # Iteruj po wszystkich kolumnach, aby znaleźć te, które potrzebują flag
-    for col_name in df.columns:
-        # Pomiń metadane i kolumny, które już są flagami
-        if col_name in cols_to_skip or col_name.endswith('_flag'):
-            continue
-        
-        # Sprawdź, czy to kolumna numeryczna (tylko takie flagujemy)
-        if not pd.api.types.is_numeric_dtype(df[col_name]):
-            continue
-
-        flag_name = f"{col_name}_flag"
-        # Stwórz nową flagę tylko, jeśli jeszcze nie istnieje
-        if flag_name not in df.columns:
-            # Użyj np.where do wektorowego stworzenia nowej kolumny:
-            # Gdzie wartość w col_name istnieje -> flaga = 0
-            # Gdzie wartość w col_name jest NaN -> flaga = 99
-            new_cols_data[flag_name] = np.where(df[col_name].notna(), 0, 99)
+    # Kolumny, które potrzebują nowej flagi: numeryczne, nie metadane, nie flagi i bez istniejącej flagi.
+    # Klasyfikacja typów jednym wywołaniem na poziomie bloków (zakres jak is_numeric_dtype: liczby i bool)
+    existing_cols = set(df.columns)
+    numeric_cols = set(df.select_dtypes(include=['number', 'bool'], exclude=['timedelta']).columns)
+    candidates = [
+        col_name for col_name in df.columns
+        if col_name in numeric_cols
+        and col_name not in cols_to_skip
+        and not col_name.endswith('_flag')
+        and f"{col_name}_flag" not in existing_cols
+    ]
 
     # Jeśli znaleziono brakujące kolumny, dodaj je wszystkie naraz
-    if new_cols_data:
-        logging.debug(f"Tworzenie {len(new_cols_data)} brakujących kolumn flag z logiką 99/0.")
-        
-        # Stwórz nową ramkę danych z nowymi kolumnami i poprawnym typem
-        new_flags_df = pd.DataFrame(new_cols_data, index=df.index).astype('int8')
-        
-        # Połącz z oryginalną ramką
-        df = pd.concat([df, new_flags_df], axis=1)
-            
-    return df
+    if candidates:
+        logging.debug(f"Tworzenie {len(candidates)} brakujących kolumn flag z logiką 99/0.")
+
+        # Jeden wektorowy skan NaN dla wszystkich kolumn -> jeden ciągły blok int8:
+        # wartość istnieje -> flaga = 0, wartość NaN -> flaga = 99
+        slab = np.where(df[candidates].isna().to_numpy(), np.int8(99), np.int8(0))
+        # copy=False: świeżo zbudowany bufor staje się jedynym blokiem int8 ramki flag (bez kopiowania)
+        new_flags_df = pd.DataFrame(slab, index=df.index, columns=[f"{c}_flag" for c in candidates], copy=False)
+
+        # Połącz z oryginalną ramką (concat tworzy nową ramkę - kopia na wejściu nie jest potrzebna)
+        return pd.concat([df, new_flags_df], axis=1)
+
+    return df.copy()
     
 def _filter_future_timestamps(df: pd.DataFrame, timestamp_col: str = 'TIMESTAMP') -> pd.DataFrame:
     """
@@ -1692,23 +3002,39 @@ def _validate_csv_file(df: pd.DataFrame, file_path: Path, config: dict) -> bool:
     
 # --- GŁÓWNE FUNKCJE PRZETWARZANIA ---
 
+# Fragmenty nazw plików, które są zawsze pomijane przy skanowaniu (jedno wyrażenie zamiast 8 testów)
+_SCAN_EXCLUDE_RE = re.compile('|'.join(map(re.escape, [
+    "sync-conflict", "CONFIG", "tmp", "checkpoint",
+    "pom1m_20210629T234501", "pom1m_20230614T234500",
+    "pom1m_20210813T234500", "pom1m_20210822T234501",
+])))
+
+@functools.lru_cache(maxsize=64)
+def _compile_source_id_patterns(source_ids: tuple) -> tuple:
+    """
+    Kompiluje source_ids grupy do dwóch wyrażeń: fragmenty szukane w całej
+    nazwie pliku oraz identyfikatory z sufiksem '$', dopasowywane do końca nazwy
+    bez rozszerzenia (stem). Zwraca (name_re | None, stem_re | None).
+    """
+    anywhere = [sid for sid in source_ids if not sid.endswith('$')]
+    stem_end = [sid.rstrip('$') for sid in source_ids if sid.endswith('$')]
+    # Identyfikator z '$' jest też (jak dotąd) szukany dosłownie, razem ze znakiem '$', w nazwie
+    anywhere += [sid for sid in source_ids if sid.endswith('$')]
+    name_re = re.compile('|'.join(map(re.escape, anywhere))) if anywhere else None
+    stem_re = re.compile('(?:' + '|'.join(map(re.escape, stem_end)) + r')\Z') if stem_end else None
+    return name_re, stem_re
+
 def scan_for_files(input_dirs: List[str], source_ids: List[str]) -> List[Path]:
     """Scans directories for matching files, ignoring sync-conflict files."""
+    name_re, stem_re = _compile_source_id_patterns(tuple(source_ids))
     all_file_paths = []
     for input_dir in input_dirs:
         p_input = Path(input_dir)
         if not p_input.is_dir(): continue
         for p_file in p_input.rglob('*'):
-            if "sync-conflict" in p_file.name: continue
-            if "CONFIG" in p_file.name: continue
-            if "tmp" in p_file.name: continue
-            if "checkpoint" in p_file.name: continue
-            if "pom1m_20210629T234501" in p_file.name: continue
-            if "pom1m_20230614T234500" in p_file.name: continue
-            if "pom1m_20210813T234500" in p_file.name: continue
-            if "pom1m_20210822T234501" in p_file.name: continue
+            if _SCAN_EXCLUDE_RE.search(p_file.name): continue
             if p_file.is_file():
-                if any((sid.endswith('$') and p_file.stem.endswith(sid.rstrip('$'))) or (sid in p_file.name) for sid in source_ids):
+                if (stem_re is not None and stem_re.search(p_file.stem)) or (name_re is not None and name_re.search(p_file.name)):
                     all_file_paths.append(p_file.resolve())
     return sorted(list(set(all_file_paths)))
 
@@ -1724,6 +3050,21 @@ def identify_file_type(file_path: Path) -> str:
     except Exception:
         return 'UNKNOWN'
 
+def _optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bezstratnie zmniejsza kolumny całkowitoliczbowe (int64 -> najmniejszy mieszczący wartości typ).
+    Kolumny float64 zostają bez zmian: float32 zmieniłby wyniki kalibracji i formuł,
+    a kategorie psułyby późniejsze przypisania .loc na kolumnach tekstowych.
+    """
+    int_cols = df.select_dtypes(include=['int64']).columns
+    if int_cols.empty:
+        return df
+    before = df.memory_usage(index=False).sum() if logging.getLogger().isEnabledFor(logging.DEBUG) else None
+    df = df.astype({col: pd.to_numeric(df[col], downcast='integer').dtype for col in int_cols})
+    if before is not None:
+        logging.debug(f"Zmniejszenie typów: {before / 1e6:.1f} MB -> {df.memory_usage(index=False).sum() / 1e6:.1f} MB.")
+    return df
+
 def process_binary_file(args: tuple) -> Optional[pd.DataFrame]:
     """Processing pipeline for a single binary file (TOB1/TOA5)."""
     file_path, config = args
@@ -1743,150 +3084,71 @@ def process_binary_file(args: tuple) -> Optional[pd.DataFrame]:
 
         # Apply only the specified filter for this pipeline
         df = filter_by_realistic_date_range(df, file_path)
-        return df
+        # Mniejsze kolumny całkowite = mniej danych do przesłania z procesu roboczego
+        return _optimize_dtypes(df)
     except Exception as e:
         logging.error(f"Krytyczny błąd (plik binarny) {file_path.name}: {e}", exc_info=True)
         return None
 
-def process_and_save_data(raw_dfs: List[pd.DataFrame], config: dict, lock: multiprocessing.Lock):
+def _pool_chunksize(n_items: int, n_workers: int, max_chunk: int = 16) -> int:
     """
-    Final, unified processing pipeline.
-    Wersja 8.2: Poprawki błędów składni i robustniejsze łączenie danych.
+    Liczba plików wysyłana do procesu roboczego jednorazowo: ok. 4 porcje na proces,
+    ale nie więcej niż max_chunk, by pasek postępu i równoważenie obciążenia działały.
     """
-    group_id = config['file_id']
-    
-    # 1. Process logger data and group by year
-    logger_data_by_year = defaultdict(pd.DataFrame)
-    if raw_dfs:
-        logging.debug(f"Przetwarzanie {len(raw_dfs)} ramek danych z loggerów.")
-        non_empty_dfs = [df for df in raw_dfs if not df.empty]
-        if non_empty_dfs:
-            full_logger_df = pd.concat(non_empty_dfs, ignore_index=True)
-            if 'TIMESTAMP' in full_logger_df.columns:
-                full_logger_df.dropna(subset=['TIMESTAMP'], inplace=True)
-                full_logger_df = full_logger_df.groupby('TIMESTAMP').first()
-                for year, year_group in full_logger_df.groupby(full_logger_df.index.year):
-                    logger_data_by_year[year] = year_group
-
-    # 2. Find all available years from MATLAB data
-    matlab_years = []
-    if group_id in GROUP_IDS_FOR_MATLAB_FILL:
-        matlab_years = find_matlab_years(config) 
-
-    # 3. Determine the full set of years to process
-    all_years = set(logger_data_by_year.keys()) | set(matlab_years)
-
-    if not all_years:
-        logging.warning("Brak danych do przetworzenia (nie znaleziono danych z loggerów ani pasujących plików .MAT).")
-        return
-
-    logging.info(f"Rozpoczynanie finalnego przetwarzania i zapisu dla lat: {sorted(list(all_years))}...")
-
-    # 4. Loop over all years and process
-    for year in sorted(list(all_years)):
-        try:
-            logging.info(f"--- Przetwarzanie roku: {int(year)} | Grupa: {group_id} ---")
-
-            logger_data_df = logger_data_by_year.get(year, pd.DataFrame())
-            
-            matlab_df = pd.DataFrame()
-            if group_id in GROUP_IDS_FOR_MATLAB_FILL:
-                matlab_df = load_matlab_data(int(year), config)
-                if not matlab_df.empty:
-                    matlab_df.set_index('TIMESTAMP', inplace=True)
-
-            # Combine logger and MATLAB data
-            if not logger_data_df.empty and not matlab_df.empty:
-                # Use a more robust method than combine_first to avoid internal pandas errors
-                combined_df = pd.concat([logger_data_df, matlab_df])
-                combined_df = combined_df.groupby(combined_df.index).first()
-                combined_df.reset_index(inplace=True)
-                logging.info(f"Połączono dane z loggera i .MAT dla roku: {int(year)}")
-            elif not matlab_df.empty:
-                combined_df = matlab_df.reset_index()
-                logging.info(f"Użyto tylko danych z .MAT dla roku: {int(year)}")
-            elif not logger_data_df.empty:
-                combined_df = logger_data_df.reset_index()
-            else:
-                logging.warning(f"Brak danych dla roku {year} (ani z loggera, ani z .MAT).")
-                continue
-
-            if combined_df.empty:
-                logging.warning(f"Brak danych dla roku {year} po próbie scalenia.")
-                continue
-
-            # Krok A: Zastosuj mapowanie nazw. Może to utworzyć duplikaty.
-            mapped_df = apply_column_mapping(combined_df, config)
-
-            # Krok B: Centralne i jedyne miejsce scalania duplikatów.
-            if mapped_df.columns.duplicated().any():
-                logging.info(f"Scalanie zduplikowanych kolumn po mapowaniu dla roku {int(year)}...")
-                mapped_df = mapped_df.T.groupby(level=0).first().T
-                
-                if 'TIMESTAMP' in mapped_df.columns:
-                    mapped_df['TIMESTAMP'] = pd.to_datetime(mapped_df['TIMESTAMP'], errors='coerce')
-                else:
-                    mapped_df.reset_index(inplace=True)
-                    mapped_df.rename(columns={'index': 'TIMESTAMP'}, inplace=True)
-                    mapped_df['TIMESTAMP'] = pd.to_datetime(mapped_df['TIMESTAMP'], errors='coerce')
+    return max(1, min(max_chunk, n_items // (max(1, n_workers or 1) * 4)))
 
-                mapped_df.dropna(subset=['TIMESTAMP'], inplace=True)
-                mapped_df = _enforce_numeric_types(mapped_df)
-                logging.info("Scalanie zakończone.")
-            
-            # Krok C: Oczyszczenie nazw kolumn.
-            mapped_df = _sanitize_column_names(mapped_df)
-            if mapped_df.empty: continue
+def make_pipeline(config: dict):
+    """
+    Buduje raz na wywołanie (grupę) funkcję korekt i flagowania ramki danych jednego roku.
+    Parametry grupy (file_id, interwał, config) są związane w domknięciu, a kolejność
+    kroków jest zdefiniowana w jednym miejscu.
+    """
+    file_id = config['file_id']
+    interval = config.get('interval')
 
-            corrected_df = mapped_df.copy()
+    def pipeline(df: pd.DataFrame) -> pd.DataFrame:
+        corrected_df = df.copy()
 
-            corrected_df['TIMESTAMP'] = apply_timezone_correction(corrected_df['TIMESTAMP'], config['file_id'])
-            corrected_df.dropna(subset=['TIMESTAMP'], inplace=True)
-            if corrected_df.empty: continue
+        corrected_df['TIMESTAMP'] = apply_timezone_correction(corrected_df['TIMESTAMP'], file_id)
+        corrected_df.dropna(subset=['TIMESTAMP'], inplace=True)
+        if corrected_df.empty:
+            return corrected_df
 
-            corrected_df = apply_manual_time_shifts(corrected_df, config['file_id'])
-            corrected_df = apply_calibration(corrected_df, config['file_id'])
-            corrected_df = apply_value_range_flags(corrected_df)
-            corrected_df = apply_quality_flags(corrected_df, config)
-            corrected_df = apply_manual_overrides(corrected_df, config)
-            corrected_df = align_timestamp(corrected_df, config.get('interval'))
-            corrected_df = _ensure_flag_columns_exist(corrected_df)
-            corrected_df = corrected_df.copy()
-            corrected_df = _filter_future_timestamps(corrected_df)
+        corrected_df = apply_manual_time_shifts(corrected_df, file_id)
+        corrected_df = apply_calibration(corrected_df, file_id)
+        corrected_df = apply_value_range_flags(corrected_df)
+        corrected_df = apply_quality_flags(corrected_df, config)
+        corrected_df = apply_manual_overrides(corrected_df, config)
+        corrected_df = align_timestamp(corrected_df, interval)
+        corrected_df = _ensure_flag_columns_exist(corrected_df)
+        corrected_df = corrected_df.copy()
+        return _filter_future_timestamps(corrected_df)
 
-            output_format = config.get('output_format', 'sqlite')
-            if output_format in ['sqlite', 'both']:
-                save_dataframe_to_sqlite(corrected_df, config, lock)
-            if output_format in ['csv', 'both']:
-                save_dataframe_to_csv(corrected_df, int(year), config, lock)
+    return pipeline
 
-        except Exception as e:
-            logging.error(f"Krytyczny błąd podczas finalnego przetwarzania roku {int(year)}: {e}", exc_info=True)
+def process_and_save_data(raw_dfs: List[pd.DataFrame], config: dict, lock: multiprocessing.Lock):
     """
     Final, unified processing pipeline.
-    Wersja 8.1: Restrukturyzacja w celu poprawnego ładowania danych .MAT, nawet gdy brakuje danych z loggerów.
+    Wersja 8.2: Poprawki błędów składni i robustniejsze łączenie danych.
     """
     group_id = config['file_id']
+    pipeline = make_pipeline(config)
     
     # 1. Process logger data and group by year
     logger_data_by_year = defaultdict(pd.DataFrame)
     if raw_dfs:
         logging.debug(f"Przetwarzanie {len(raw_dfs)} ramek danych z loggerów.")
-        # Use list comprehension to filter out empty dataframes before concatenation
         non_empty_dfs = [df for df in raw_dfs if not df.empty]
         if non_empty_dfs:
             full_logger_df = pd.concat(non_empty_dfs, ignore_index=True)
             if 'TIMESTAMP' in full_logger_df.columns:
                 full_logger_df.dropna(subset=['TIMESTAMP'], inplace=True)
-                # Group by timestamp to handle duplicates across files
                 full_logger_df = full_logger_df.groupby('TIMESTAMP').first()
-                # Now group by year
                 for year, year_group in full_logger_df.groupby(full_logger_df.index.year):
                     logger_data_by_year[year] = year_group
 
     # 2. Find all available years from MATLAB data
     matlab_years = []
-    logging.debug(f"Sprawdzanie czy group_id '{group_id}' jest w GROUP_IDS_FOR_MATLAB_FILL. Zawartość listy: {GROUP_IDS_FOR_MATLAB_FILL}")
     if group_id in GROUP_IDS_FOR_MATLAB_FILL:
         matlab_years = find_matlab_years(config) 
 
@@ -1906,7 +3168,6 @@ def process_and_save_data(raw_dfs: List[pd.DataFrame], config: dict, lock: multi
 
             logger_data_df = logger_data_by_year.get(year, pd.DataFrame())
             
-            # Load MATLAB data for the current year
             matlab_df = pd.DataFrame()
             if group_id in GROUP_IDS_FOR_MATLAB_FILL:
                 matlab_df = load_matlab_data(int(year), config)
@@ -1915,7 +3176,7 @@ def process_and_save_data(raw_dfs: List[pd.DataFrame], config: dict, lock: multi
 
             # Combine logger and MATLAB data
             if not logger_data_df.empty and not matlab_df.empty:
-                combined_df = logger_data_df.combine_first(matlab_df).reset_index()
+                combined_df = fill_gaps_from_matlab(logger_data_df, matlab_df).reset_index()
                 logging.info(f"Połączono dane z loggera i .MAT dla roku: {int(year)}")
             elif not matlab_df.empty:
                 combined_df = matlab_df.reset_index()
@@ -1953,22 +3214,9 @@ def process_and_save_data(raw_dfs: List[pd.DataFrame], config: dict, lock: multi
             mapped_df = _sanitize_column_names(mapped_df)
             if mapped_df.empty: continue
 
-            corrected_df = mapped_df.copy()
-
-            corrected_df['TIMESTAMP'] = apply_timezone_correction(corrected_df['TIMESTAMP'], config['file_id'])
-            corrected_df.dropna(subset=['TIMESTAMP'], inplace=True)
+            corrected_df = pipeline(mapped_df)
             if corrected_df.empty: continue
 
-            corrected_df = apply_manual_time_shifts(corrected_df, config['file_id'])
-            corrected_df = apply_calibration(corrected_df, config['file_id'])
-            corrected_df = apply_value_range_flags(corrected_df)
-            corrected_df = apply_quality_flags(corrected_df, config)
-            corrected_df = apply_manual_overrides(corrected_df, config)
-            corrected_df = align_timestamp(corrected_df, config.get('interval'))
-            corrected_df = _ensure_flag_columns_exist(corrected_df)
-            corrected_df = corrected_df.copy()
-            corrected_df = _filter_future_timestamps(corrected_df)
-
             output_format = config.get('output_format', 'sqlite')
             if output_format in ['sqlite', 'both']:
                 save_dataframe_to_sqlite(corrected_df, config, lock)
@@ -1977,118 +3225,7 @@ def process_and_save_data(raw_dfs: List[pd.DataFrame], config: dict, lock: multi
 
         except Exception as e:
             logging.error(f"Krytyczny błąd podczas finalnego przetwarzania roku {int(year)}: {e}", exc_info=True)
-    group_id = config['file_id']
-    
-    # 1. Process logger data and group by year
-    logger_data_by_year = defaultdict(pd.DataFrame)
-    if raw_dfs:
-        logging.debug(f"Przetwarzanie {len(raw_dfs)} ramek danych z loggerów.")
-        # Use list comprehension to filter out empty dataframes before concatenation
-        non_empty_dfs = [df for df in raw_dfs if not df.empty]
-        if non_empty_dfs:
-            full_logger_df = pd.concat(non_empty_dfs, ignore_index=True)
-            if 'TIMESTAMP' in full_logger_df.columns:
-                full_logger_df.dropna(subset=['TIMESTAMP'], inplace=True)
-                # Group by timestamp to handle duplicates across files
-                full_logger_df = full_logger_df.groupby('TIMESTAMP').first()
-                # Now group by year
-                for year, year_group in full_logger_df.groupby(full_logger_df.index.year):
-                    logger_data_by_year[year] = year_group
-
-    # 2. Find all available years from MATLAB data
-    matlab_years = []
-    logging.debug(f"Sprawdzanie czy group_id '{group_id}' jest w GROUP_IDS_FOR_MATLAB_FILL. Zawartość listy: {GROUP_IDS_FOR_MATLAB_FILL}")
-    if group_id in GROUP_IDS_FOR_MATLAB_FILL:
-        matlab_years = find_matlab_years(config) 
-
-    # 3. Determine the full set of years to process
-    all_years = set(logger_data_by_year.keys()) | set(matlab_years)
-
-    if not all_years:
-        logging.warning("Brak danych do przetworzenia (nie znaleziono danych z loggerów ani pasujących plików .MAT).")
-        return
-
-    logging.info(f"Rozpoczynanie finalnego przetwarzania i zapisu dla lat: {sorted(list(all_years))}...")
-
-    # 4. Loop over all years and process
-    for year in sorted(list(all_years)):
-        try:
-            logging.info(f"--- Przetwarzanie roku: {int(year)} | Grupa: {group_id} ---")
-
-            logger_data_df = logger_data_by_year.get(year, pd.DataFrame())
-            
-            # Load MATLAB data for the current year
-            matlab_df = pd.DataFrame()
-            if group_id in GROUP_IDS_FOR_MATLAB_FILL:
-                matlab_df = load_matlab_data(int(year), config)
-                if not matlab_df.empty:
-                    matlab_df.set_index('TIMESTAMP', inplace=True)
-
-            # Combine logger and MATLAB data
-            if not logger_data_df.empty and not matlab_df.empty:
-                combined_df = logger_data_df.combine_first(matlab_df).reset_index()
-                logging.info(f"Połączono dane z loggera i .MAT dla roku: {int(year)}")
-            elif not matlab_df.empty:
-                combined_df = matlab_df.reset_index()
-                logging.info(f"Użyto tylko danych z .MAT dla roku: {int(year)}")
-            elif not logger_data_df.empty:
-                combined_df = logger_data_df.reset_index()
-            else:
-                logging.warning(f"Brak danych dla roku {year} (ani z loggera, ani z .MAT).")
-                continue
-
-            if combined_df.empty:
-                logging.warning(f"Brak danych dla roku {year} po próbie scalenia.")
-                continue
-
-            # Krok A: Zastosuj mapowanie nazw. Może to utworzyć duplikaty.
-            mapped_df = apply_column_mapping(combined_df, config)
-
-            # Krok B: Centralne i jedyne miejsce scalania duplikatów.
-            if mapped_df.columns.duplicated().any():
-                logging.info(f"Scalanie zduplikowanych kolumn po mapowaniu dla roku {int(year)}...")
-                mapped_df = mapped_df.T.groupby(level=0).first().T
-                
-                if 'TIMESTAMP' in mapped_df.columns:
-                    mapped_df['TIMESTAMP'] = pd.to_datetime(mapped_df['TIMESTAMP'], errors='coerce')
-                else:
-                    mapped_df.reset_index(inplace=True)
-                    mapped_df.rename(columns={'index': 'TIMESTAMP'}, inplace=True)
-                    mapped_df['TIMESTAMP'] = pd.to_datetime(mapped_df['TIMESTAMP'], errors='coerce')
-
-                mapped_df.dropna(subset=['TIMESTAMP'], inplace=True)
-                mapped_df = _enforce_numeric_types(mapped_df)
-                logging.info("Scalanie zakończone.")
-            
-            # Krok C: Oczyszczenie nazw kolumn.
-            mapped_df = _sanitize_column_names(mapped_df)
-            if mapped_df.empty: continue
-
-            corrected_df = mapped_df.copy()
-
-            corrected_df['TIMESTAMP'] = apply_timezone_correction(corrected_df['TIMESTAMP'], config['file_id'])
-            corrected_df.dropna(subset=['TIMESTAMP'], inplace=True)
-            if corrected_df.empty: continue
-
-            corrected_df = apply_manual_time_shifts(corrected_df, config['file_id'])
-            corrected_df = apply_calibration(corrected_df, config['file_id'])
-            corrected_df = apply_value_range_flags(corrected_df)
-            corrected_df = apply_quality_flags(corrected_df, config)
-            corrected_df = apply_manual_overrides(corrected_df, config)
-            corrected_df = align_timestamp(corrected_df, config.get('interval'))
-            corrected_df = _ensure_flag_columns_exist(corrected_df)
-            corrected_df = corrected_df.copy()
-            corrected_df = _filter_future_timestamps(corrected_df)
-
-            output_format = config.get('output_format', 'sqlite')
-            if output_format in ['sqlite', 'both']:
-                save_dataframe_to_sqlite(corrected_df, config, lock)
-            if output_format in ['csv', 'both']:
-                save_dataframe_to_csv(corrected_df, int(year), config, lock)
 
-        except Exception as e:
-            logging.error(f"Krytyczny błąd podczas finalnego przetwarzania roku {int(year)}: {e}", exc_info=True)
-            
 # --- FUNKCJA TESTUJĄCA ---
 def _run_tests(config: dict):
     """
@@ -2096,6 +3233,7 @@ def _run_tests(config: dict):
     identycznej jak w funkcji main() i poprawnie zamykając połączenia z bazą.
     Wersja 7.82 FINAL: Pełna spójność logiki i poprawne zarządzanie zasobami.
     """
+    import sqlalchemy  # pyright: ignore[reportMissingImports]
     logging.info("="*20 + " URUCHAMIANIE TRYBU TESTOWEGO " + "="*20)
     with tempfile.TemporaryDirectory() as temp_dir_str:
         temp_dir = Path(temp_dir_str)
@@ -2123,7 +3261,7 @@ def _run_tests(config: dict):
             # Ta część pozostaje uproszczona, zakładając, że główny problem leży w CSV
             binary_args = [(p, test_config) for p in binary_files]
             with multiprocessing.Pool(processes=test_config['jobs']) as pool:
-                binary_results = list(pool.imap_unordered(process_binary_file, binary_args))
+                binary_results = list(pool.imap_unordered(process_binary_file, binary_args, chunksize=_pool_chunksize(len(binary_args), test_config['jobs'])))
             all_raw_results.extend([df for df in binary_results if df is not None and not df.empty])
         
         if csv_files:
@@ -2310,10 +3448,7 @@ def main():
 
     # Overwrite implies no-cache
     use_cache = not (args.no_cache or args.overwrite)
-    processed_files_cache = load_cache() if use_cache else {}
-    all_files = scan_for_files(args.input_dir, group_config.get('source_ids', []))
-    files_to_process = [p for p in all_files if not is_file_in_cache(p, processed_files_cache)]
-    
+
     if args.run_tests:
         _run_tests(group_config)
         return
@@ -2324,18 +3459,19 @@ def main():
     if args.output_format in ['sqlite', 'both']:
         initialize_database(Path(args.db_path))
 
-    processed_files_cache = load_cache() if not args.no_cache else {}
     # --- Cache and File Scanning ---
-    cache = load_cache() if not args.no_cache else {}
+    processed_files_cache = load_cache() if not args.no_cache else {}
+    cache = processed_files_cache
     all_files = scan_for_files(group_config['input_dir'], group_config.get('source_ids', []))
     
     if not args.no_cache and not args.overwrite:
-        processed_files_from_cache = [p for p in all_files if is_file_in_cache(p, cache)]
+        # Jeden stat() na plik: podział na pliki z cache i do przetworzenia w jednym przebiegu
+        processed_files_from_cache, files_to_process = [], []
+        for p in all_files:
+            (processed_files_from_cache if is_file_in_cache(p, cache) else files_to_process).append(p)
         if processed_files_from_cache:
             logging.info(f"Znaleziono {len(processed_files_from_cache)} plików w cache, które zostaną pominięte.")
         
-        files_to_process = [p for p in all_files if not is_file_in_cache(p, cache)]
-        
         if not files_to_process:
             logging.info("Brak nowych lub zmodyfikowanych plików do przetworzenia z loggerów.")
             # If the group is not eligible for MAT file filling, exit now.
@@ -2359,7 +3495,9 @@ def main():
         logging.info(f"Przetwarzanie {len(binary_files)} plików binarnych (TOB1/TOA5)...")
         binary_args = [(p, group_config) for p in binary_files]
         with multiprocessing.Pool(processes=args.jobs) as pool:
-            binary_results = list(tqdm(pool.imap_unordered(process_binary_file, binary_args), total=len(binary_files), desc="Pliki binarne"))
+            chunksize = _pool_chunksize(len(binary_args), args.jobs)
+            # Pasek odświeżany co porcję plików, a nie po każdym pliku
+            binary_results = list(tqdm(pool.imap_unordered(process_binary_file, binary_args, chunksize=chunksize), total=len(binary_files), desc="Pliki binarne", miniters=chunksize, mininterval=0.5))
         all_raw_results.extend([df for df in binary_results if df is not None and not df.empty])
 
     # Pipeline 2: Process ALL CSV files at once, sorted by modification time
@@ -2444,7 +3582,7 @@ def main():
             logging.info(f"Przetwarzanie grupy: {group_name}, liczba plików: {len(file_list)}")
             
             # Wczytanie plików (serialne)
-            all_csv_dfs = [read_simple_csv_data(p) for p in tqdm(file_list, desc=f"Wczytywanie plików CSV - {group_name}")]
+            all_csv_dfs = [read_simple_csv_data(p) for p in tqdm(file_list, desc=f"Wczytywanie plików CSV - {group_name}", mininterval=0.5)]
             non_empty_dfs = [df for df in all_csv_dfs if df is not None and not df.empty]
             # # --- DEBUG: Zapisz ramkę danych PRZED deduplikacją ---
             # try: